@@ -1,68 +1,192 @@
-import requests
-from models import db, connect_db, User, Task, Group
+from models import db, connect_db, update_owned, delete_owned, User, UserRow, Task, TaskRow, Group
+from cache import LRUCache
+from pool import pool_stats
+from events import EventBroker, notify_change
+from config import CONFIGS
+from slack_client import SlackClientError
 import os
+import json
+import base64
+import hashlib
+import hmac
+import sys
+import time
+from functools import wraps
+from queue import Empty
 
-from flask import Flask, render_template, request, flash, redirect, session, cli, url_for, g, jsonify, make_response
-from flask_cors import CORS
-from flask_debugtoolbar import DebugToolbarExtension
+from flask import Blueprint, Flask, Response, current_app, render_template, request, flash, redirect, session, cli, url_for, g, jsonify, make_response, abort, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
 
-from slack_sdk.oauth import AuthorizeUrlGenerator
-from slack_sdk.web import WebClient
-from slack_sdk.oauth.installation_store import FileInstallationStore, Installation
-from slack_sdk.oauth.state_store import FileOAuthStateStore
-from slack_sdk.signature import SignatureVerifier
+from datetime import date, datetime
 
-from datetime import date, timedelta
+bp = Blueprint('dolt', __name__)
 
-app = Flask(__name__)
 
-# Issue and consume state parameter value on the server-side.
-state_store = FileOAuthStateStore(
-    expiration_seconds=300, base_dir="./data")
+def create_app(config=None):
+    """Create the Dolt app with the named configuration profile.
 
-# Persist installation data and lookup it by IDs.
-installation_store = FileInstallationStore(base_dir="./data")
+    Without a name, the profile is taken from FLASK_ENV and defaults to
+    production. Nothing here talks to the database or to Slack, so that
+    worker boot stays cheap; the tables are created with `flask create-db`.
+    """
 
-# Activate CORS for flask app
-CORS(app)
+    config = config or os.environ.get('FLASK_ENV', 'production')
 
-# Load .env variables
-cli.load_dotenv('.env')
+    # Load .env variables when developing locally
+    if config == 'development':
+        cli.load_dotenv('.env')
 
-# Get DB_URI from environ variable (useful for production/testing) or,
-# if not set there, use development local db.
-app.config['SQLALCHEMY_DATABASE_URI'] = (
-    os.environ.get('DATABASE_URL', 'postgres:///dolt'))
+    app = Flask(__name__)
+    app.config.from_object(CONFIGS[config]())
 
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ECHO'] = False
-app.config['DEBUG_TB_INTERCEPT_REDIRECTS'] = False
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', "secret123")
-toolbar = DebugToolbarExtension(app)
+    # Activate CORS for flask app
+    from flask_cors import CORS
+    CORS(app)
 
-connect_db(app)
+    if app.config['DEBUG_TB_ENABLED']:
+        from flask_debugtoolbar import DebugToolbarExtension
+        DebugToolbarExtension(app)
+
+    from assets import init_assets
+
+    connect_db(app)
+    init_assets(app)
+    app.register_blueprint(bp)
+
+    init_process_state(app)
+
+    @app.cli.command('create-db')
+    def create_db():
+        """Create the tables and indexes that don't exist yet."""
+
+        db.create_all(bind=None)
+
+    return app
+
+
+def init_process_state(app):
+    """Create the caches and Slack clients of app for this process.
+
+    Gunicorn calls this again in every worker after forking, so that workers
+    share no caches, thread pools or connections with the master process.
+    """
+
+    from slack_client import SlackClient, CircuitBreaker
+    from slack_commands import CommandRunner
+
+    # Users identified by the session, so that requests don't need a query
+    # for it
+    app.user_cache = LRUCache(
+        maxsize=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['USER_CACHE_TTL'])
+
+    # Sidebar task counts by user, dropped whenever the tasks of a user change
+    app.counts_cache = LRUCache(
+        maxsize=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['COUNTS_CACHE_TTL'])
+
+    # Rendered task pages by user, view, sort and data version
+    app.page_cache = LRUCache(
+        maxsize=app.config['PAGE_CACHE_SIZE'],
+        maxbytes=app.config['PAGE_CACHE_BYTES'],
+        sizeof=sys.getsizeof)
+
+    # Users who changed something recently, whose reads stay on the primary
+    app.recent_writers = LRUCache(
+        maxsize=app.config['USER_CACHE_SIZE'],
+        ttl=app.config['REPLICA_PIN_SECONDS'])
+
+    # Streams of change events open in this process
+    app.events = EventBroker(
+        app.config['EVENTS_DATABASE_URL']
+        or app.config['SQLALCHEMY_DATABASE_URI'])
+
+    # Every call to Slack goes through this client, so that connections are
+    # reused and a slow or failing Slack can't tie up all workers
+    app.slack = SlackClient(
+        base_url=app.config['SLACK_API_URL'],
+        timeout=(3, app.config['SLACK_TIMEOUT']),
+        max_retries=app.config['SLACK_MAX_RETRIES'],
+        pool_size=app.config['SLACK_COMMAND_WORKERS'],
+        breaker=CircuitBreaker(
+            failure_threshold=app.config['SLACK_BREAKER_FAILURES'],
+            reset_timeout=app.config['SLACK_BREAKER_RESET']))
+
+    # Slash commands are answered from this pool after acknowledging them
+    app.command_runner = CommandRunner(
+        app,
+        app.slack,
+        max_workers=app.config['SLACK_COMMAND_WORKERS'],
+        max_pending=app.config['SLACK_COMMAND_QUEUE'])
+
+
+def state_store():
+    """Return the store issuing and consuming OAuth state values."""
+
+    from stores import SQLOAuthStateStore
+    return SQLOAuthStateStore(
+        expiration_seconds=current_app.config['SLACK_STATE_TTL'])
+
+
+def installation_store():
+    """Return the store of Slack app installations."""
+
+    from stores import SQLInstallationStore
+    return SQLInstallationStore()
 
-db.create_all()
 
 ###############################################################################
 # Before the requests
 
 
-@app.before_request
+@bp.before_app_request
+def reset_query_count():
+    """Start counting the queries run for this request."""
+
+    g.query_count = 0
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def count_query(conn, cursor, statement, parameters, context, executemany):
+    """Count a query in g.query_count, so that tests can catch N+1 queries."""
+
+    if has_request_context() and 'query_count' in g:
+        g.query_count += 1
+
+
+@bp.before_app_request
 def add_user_to_g():
     """If we're logged in, add curr user to Flask global."""
 
     if 'CURR_USER_KEY' in session:
-        g.user = User.query.get(session['CURR_USER_KEY'])
+        g.user = get_user(session['CURR_USER_KEY'])
     else:
         g.user = None
 
 
+def get_user(user_id):
+    """Return a user by id from the user cache or the db."""
+
+    user = current_app.user_cache.get(user_id)
+    if user is None:
+        user = User.query.get(user_id)
+        if user is not None:
+            user = UserRow.from_user(user)
+            current_app.user_cache.set(user_id, user)
+
+    return user
+
+
 def do_login(user):
     """Log in user."""
 
     session['CURR_USER_KEY'] = user.id
-    session['sort'] = 'recent'
+    session['sort'] = Task.SORTS[0]
+
+    # The user may have just been added or updated
+    current_app.user_cache.delete(user.id)
+    current_app.page_cache.delete_where(lambda key: key[0] == user.id)
     flash(f"Hello, {user.name}!", "success")
 
 
@@ -71,13 +195,238 @@ def do_logout():
 
     if 'CURR_USER_KEY' in session:
         del session['CURR_USER_KEY']
-        del session['sort']
+        session.pop('sort', None)
+
+
+def tasks_changed(user_id, change, ids=()):
+    """Record a change to the tasks or groups of a user.
+
+    Call this before committing every change to the tasks or groups of a
+    user, so that the new data version and the event telling open pages
+    about the change, like 'task.created' with the ids of the new tasks,
+    are committed with the change.
+    """
+
+    User.bump_data_version(user_id)
+    notify_change(user_id, change, ids)
+    current_app.counts_cache.delete(user_id)
+    current_app.page_cache.delete_where(lambda key: key[0] == user_id)
+
+    # Read the change back from the primary until the replica has it
+    current_app.recent_writers.set(user_id, True)
+    if has_request_context():
+        session['wrote_at'] = time.time()
+
+
+def batch_event(op):
+    """Return the change event of a batch operation on tasks."""
+
+    if op == 'delete':
+        return 'task.deleted'
+    if op == 'complete':
+        return 'task.completed'
+
+    return 'task.updated'
+
+
+def recently_wrote(user_id):
+    """Return whether the reads of a user must stay on the primary.
+
+    Web requests carry the time of the last change in the session, so that
+    the pin holds across workers. Slash commands only have the changes
+    seen by this process.
+    """
+
+    if current_app.recent_writers.get(user_id):
+        return True
+
+    window = current_app.config['REPLICA_PIN_SECONDS']
+    return (has_request_context()
+            and session.get('wrote_at', 0) > time.time() - window)
+
+
+def read_from_replica(user_id):
+    """Send the following queries of this request to the replica.
+
+    Only call this from views that don't write. Nothing changes if there is
+    no replica, or if the user changed something recently.
+    """
+
+    if (current_app.config['REPLICA_DATABASE_URL']
+            and not recently_wrote(user_id)):
+        db.session.info['replica'] = True
+
+
+def replica_reads(view):
+    """Serve a read-only view of the logged in user from the replica."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if g.user:
+            read_from_replica(g.user.id)
+
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def sidebar_context(version=None):
+    """Return the groups and task counts shown in the sidebar."""
+
+    if version is None:
+        version = User.get_data_version(g.user.id)
+
+    # Counts depend on the date through the due views
+    key = (version, date.today())
+    counts = current_app.counts_cache.get(g.user.id)
+    if counts is None or counts[0] != key:
+        counts = (key, Task.view_counts(g.user.id))
+        current_app.counts_cache.set(g.user.id, counts)
+
+    return dict(
+        groups=Group.for_user(g.user.id).all(),
+        counts=counts[1])
+
+
+def task_view_etag(version, view, sort, cursor):
+    """Return the ETag of a page of a task view.
+
+    Pages only change with the data version of the user, except for the
+    due views which also move with the date. The user is part of the ETag,
+    since browsers cache pages by URL even if another user signs in.
+    """
+
+    key = [current_app.config['ETAG_SALT'], g.user.id,
+           *task_view_key(version, view, sort, cursor)]
+
+    return hashlib.sha1(json.dumps(key).encode()).hexdigest()
+
+
+def task_view_key(version, view, sort, cursor):
+    """Return what a page of a task view depends on besides the user."""
+
+    return (version, view, sort, cursor,
+            current_app.config['TASKS_PAGE_SIZE'], date.today().isoformat())
+
+
+def get_sort():
+    """Return the sorting option of the session, or the default one."""
+
+    sort = session.get('sort')
+    return sort if sort in Task.SORTS else Task.SORTS[0]
+
+
+def encode_cursor(sort, task):
+    """Encode the sort key of the last task on a page as a cursor."""
+
+    value, id = Task.sort_key(sort, task)
+    if value is not None and sort != 'alphabetical':
+        value = value.isoformat()
+
+    data = json.dumps([sort, value, id]).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_cursor(cursor, sort):
+    """Decode a cursor into a sort key, aborting if it is not valid."""
+
+    try:
+        cursor_sort, value, id = json.loads(base64.urlsafe_b64decode(cursor))
+        if cursor_sort != sort or not isinstance(id, int):
+            raise ValueError(cursor)
+        if sort == 'recent':
+            value = datetime.fromisoformat(value)
+        elif sort == 'due' and value is not None:
+            value = date.fromisoformat(value)
+        elif sort == 'alphabetical' and not isinstance(value, str):
+            raise ValueError(cursor)
+    except (ValueError, TypeError):
+        abort(400)
+
+    return (value, id)
+
+
+def render_task_view(view):
+    """Render the first page of tasks in a view.
+
+    If the request has a cursor, only the tasks after it are rendered, so
+    that the client can append them to the list while scrolling.
+    """
+
+    sort = get_sort()
+    cursor = request.args.get('cursor')
+
+    # Answer with 304 before running any task query if nothing changed.
+    # Pages with flashed messages are always rendered to show them.
+    version = User.get_data_version(g.user.id)
+    etag = task_view_etag(version, view, sort, cursor)
+    if request.if_none_match.contains_weak(etag) and '_flashes' not in session:
+        response = make_response('', 304)
+    else:
+        response = make_response(
+            cached_task_page(view, sort, cursor, version))
+
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'private, no-cache'
+
+    return response
+
+
+def cached_task_page(view, sort, cursor, version):
+    """Return a rendered page of tasks from the page cache if possible.
+
+    Pages with flashed messages are neither cached nor served from the
+    cache, since they show and consume the messages.
+    """
+
+    if '_flashes' in session:
+        return render_task_page(view, sort, cursor, version)
+
+    key = (g.user.id, *task_view_key(version, view, sort, cursor))
+    page = current_app.page_cache.get(key)
+    if page is None:
+        page = render_task_page(view, sort, cursor, version)
+        current_app.page_cache.set(key, page)
+
+    return page
+
+
+def render_task_page(view, sort, cursor, version):
+    """Render a page of tasks, or only the tasks after the cursor."""
+
+    query = Task.rows_for_view(g.user.id, view, sort)
+    if cursor:
+        query = query.filter(
+            Task.after_key(sort, decode_cursor(cursor, sort)))
+
+    # Fetch one extra task to know whether there is another page
+    page_size = current_app.config['TASKS_PAGE_SIZE']
+    tasks = [TaskRow._make(row) for row in query.limit(page_size + 1)]
+    next_cursor = None
+    if len(tasks) > page_size:
+        tasks = tasks[:page_size]
+        next_cursor = encode_cursor(sort, tasks[-1])
+
+    if cursor:
+        return render_template(
+            'components/tasks/task_page.html',
+            tasks=tasks,
+            next_cursor=next_cursor)
+
+    return render_template(
+        'home.html',
+        tasks=tasks,
+        next_cursor=next_cursor,
+        view=view,
+        user=g.user,
+        sort=sort,
+        **sidebar_context(version))
 
 
 ##########################################################################
 # Home, logging in, logging out, installing app
 
-@app.route("/")
+@bp.route("/")
 def homepage():
     """Show homepage."""
 
@@ -88,15 +437,16 @@ def homepage():
         return render_template('login.html')
 
 
-@app.route("/login")
+@bp.route("/login")
 def login():
     """Login."""
 
     # Generate a random value and store it on the server-side
-    state = state_store.issue()
+    state = state_store().issue()
 
     # Build https://slack.com/oauth/v2/authorize with sufficient query
     # parameters
+    from slack_sdk.oauth import AuthorizeUrlGenerator
     authorize_url_generator = AuthorizeUrlGenerator(
         client_id=os.environ.get("SLACK_CLIENT_ID", None),
         user_scopes=["identity.basic", "identity.email",
@@ -109,17 +459,25 @@ def login():
     return redirect(redirect_uri)
 
 
-@app.route("/login/callback")
+@bp.app_errorhandler(SlackClientError)
+def slack_unavailable(e):
+    """Tell the user to try again when Slack doesn't answer in time."""
+
+    current_app.logger.warning("Slack call failed: %s", e)
+    flash("Slack is not responding right now, please try again.", "danger")
+    return redirect("/")
+
+
+@bp.route("/login/callback")
 def login_callback():
     """Handle callback for the login."""
 
     # Retrieve the auth code from the request params
     if "code" in request.args:
         # Verify the state parameter
-        if state_store.consume(request.args.get("state")):
-            client = WebClient()  # no prepared token needed for this
+        if state_store().consume(request.args.get("state")):
             # Complete the installation by calling oauth.v2.access API method
-            oauth_response = client.oauth_v2_access(
+            oauth_response = current_app.slack.oauth_v2_access(
                 client_id=os.environ.get("SLACK_CLIENT_ID", None),
                 client_secret=os.environ.get("SLACK_CLIENT_SECRET", None),
                 redirect_uri='https://dolt.christopherklint.com/login/callback',
@@ -132,10 +490,7 @@ def login_callback():
                 token = oauth_response['authed_user']['access_token']
 
                 # Requesting the Slack identity of the user
-                client = WebClient(token=token)
-                user_response = client.api_call(
-                    api_method='users.identity',
-                )
+                user_response = current_app.slack.users_identity(token)
 
                 # Check if the request to Slack API was successful
                 if user_response['ok']:
@@ -170,10 +525,10 @@ def login_callback():
                             slack_user_id=slack_user_id).first()
                         do_login(user)
 
-    return redirect(url_for('homepage'))
+    return redirect(url_for('.homepage'))
 
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     """Handle logout of user."""
 
@@ -182,11 +537,12 @@ def logout():
     return redirect("/")
 
 
-@app.route("/slack/install", methods=["GET"])
+@bp.route("/slack/install", methods=["GET"])
 def oauth_start():
     """ Install slack app. """
 
     # Build https://slack.com/oauth/v2/authorize with sufficient query parameters
+    from slack_sdk.oauth import AuthorizeUrlGenerator
     authorize_url_generator = AuthorizeUrlGenerator(
         client_id=os.environ["SLACK_CLIENT_ID"],
         scopes=["app_mentions:read", "channels:read", "chat:write", "commands", "im:read",
@@ -196,29 +552,30 @@ def oauth_start():
     )
 
     # Generate a random value and store it on the server-side
-    state = state_store.issue()
+    state = state_store().issue()
 
     url = authorize_url_generator.generate(state)
 
     return redirect(url)
 
 
-@app.route("/slack/install/callback", methods=["GET"])
+@bp.route("/slack/install/callback", methods=["GET"])
 def oauth_callback():
     """ Handle callback for installing the app """
 
     # Retrieve the auth code and state from the request params
     if "code" in request.args:
         # Verify the state parameter
-        if state_store.consume(request.args.get("state")):
-            client = WebClient()  # no prepared token needed for this
+        if state_store().consume(request.args.get("state")):
             # Complete the installation by calling oauth.v2.access API method
-            oauth_response = client.oauth_v2_access(
+            oauth_response = current_app.slack.oauth_v2_access(
                 client_id=os.environ.get("SLACK_CLIENT_ID", None),
                 client_secret=os.environ.get("SLACK_CLIENT_SECRET", None),
                 redirect_uri='https://dolt.christopherklint.com/slack/install/callback',
                 code=request.args.get("code")
             )
+            if not oauth_response.get("ok"):
+                return installation_failed(oauth_response)
 
             installed_enterprise = oauth_response.get("enterprise") or {}
             installed_team = oauth_response.get("team") or {}
@@ -229,10 +586,13 @@ def oauth_callback():
             # we call bots.info for storing the installation data along with bot_id.
             bot_id = None
             if bot_token is not None:
-                auth_test = client.auth_test(token=bot_token)
-                bot_id = auth_test["bot_id"]
+                auth_test = current_app.slack.auth_test(bot_token)
+                if not auth_test.get("ok"):
+                    return installation_failed(auth_test)
+                bot_id = auth_test.get("bot_id")
 
             # Build an installation data
+            from slack_sdk.oauth.installation_store import Installation
             installation = Installation(
                 app_id=oauth_response.get("app_id"),
                 enterprise_id=installed_enterprise.get("id"),
@@ -251,13 +611,19 @@ def oauth_callback():
                     "configuration_url"),
             )
             # Store the installation
-            installation_store.save(installation)
+            installation_store().save(installation)
 
-            return redirect(url_for('login'))
+            return redirect(url_for('.login'))
         else:
             return make_response(f"Try the installation again (the state value is already expired)", 400)
 
-    error = request.args["error"] if "error" in request.args else ""
+    return installation_failed(request.args)
+
+
+def installation_failed(response):
+    """ Answer an installation that Slack reported an error for """
+
+    error = response.get("error", "")
     return make_response(f"Something is wrong with the installation (error: {error})", 400)
 
 ##########################################################################
@@ -267,32 +633,76 @@ def oauth_callback():
 # API tasks
 
 
-@app.route('/api/tasks/new', methods=['POST'])
+@bp.route('/api/tasks/new', methods=['POST'])
 def new_task():
     """ Add new task for signed in user """
     if not g.user:
         return redirect("/")
 
     # Handle AJAX request from client
-    title = request.json.get('title')
-    description = request.json.get('description')
-    date = request.json.get('date') or Task.due.default.arg
-    if request.json.get('group') == 'None':
-        task = Task(title=title, description=description,
-                    due=date, user_id=g.user.id)
-    else:
-        group = Group.query.filter_by(name=request.json.get('group')).first()
-        task = Task(title=title, description=description,
-                    due=date, group_id=group.id, user_id=g.user.id)
+    task = dict(
+        title=request.json.get('title'),
+        description=request.json.get('description'),
+        due=request.json.get('date'),
+        group_name=request.json.get('group'))
 
     # Add the new task
-    db.session.add(task)
+    ids = Task.create_many(g.user.id, [task])
+    tasks_changed(g.user.id, 'task.created', ids)
     db.session.commit()
 
-    return redirect('/')
+    return jsonify(ids=ids), 201
+
+
+def parse_bulk_task(task):
+    """Return the values of a task sent to the bulk API.
+
+    Raises ValueError for a date that is not YYYY-MM-DD and for an
+    importance that is not a boolean.
+    """
+
+    important = task.get('important')
+    if important is None:
+        important = False
+    elif not isinstance(important, bool):
+        raise ValueError(important)
+
+    return dict(
+        title=task['title'],
+        description=task.get('description'),
+        due=date.fromisoformat(task['date']) if task.get('date') else None,
+        important=important,
+        group_name=task.get('group'))
+
+
+@bp.route('/api/tasks/bulk', methods=['POST'])
+def new_tasks():
+    """ Add a list of new tasks for signed in user """
+    if not g.user:
+        return redirect("/")
+
+    # Handle AJAX request from client
+    tasks = request.json
+    if (not isinstance(tasks, list)
+            or not 0 < len(tasks) <= current_app.config['BATCH_MAX_TASKS']
+            or not all(isinstance(task, dict) and task.get('title')
+                       for task in tasks)):
+        abort(400)
+
+    # Check the values here, since one bad row fails the whole INSERT
+    try:
+        rows = [parse_bulk_task(task) for task in tasks]
+    except (ValueError, TypeError):
+        abort(400)
+
+    ids = Task.create_many(g.user.id, rows)
+    tasks_changed(g.user.id, 'task.created', ids)
+    db.session.commit()
 
+    return jsonify(ids=ids), 201
 
-@app.route('/api/tasks/<int:task_id>/edit', methods=['POST'])
+
+@bp.route('/api/tasks/<int:task_id>/edit', methods=['POST'])
 def edit_task_submit(task_id):
     """ Submit updated task for signed in user """
     if not g.user:
@@ -301,26 +711,29 @@ def edit_task_submit(task_id):
     # Handle AJAX request from client
     title = request.form.get('title')
     description = request.form.get('description')
-    date = request.form.get('date')
-
-    # Add the new task
-    task = Task.query.get_or_404(task_id)
-    task.title = title
-    task.description = description
-    task.date = date
-    if request.form['group'] != 'None':
-        group = Group.query.filter_by(name=request.form['group']).first()
-        task.group_id = group.id
+    due = request.form.get('date')
+    group_name = request.form.get('group')
+
+    values = dict(title=title, description=description)
+    if due and due != 'None':
+        values['due'] = due
+    if group_name and group_name != 'None':
+        values['group_id'] = Group.id_by_name(g.user.id, group_name)
     else:
-        task.group_id = None
+        values['group_id'] = None
+
+    # Update the task if it belongs to the user
+    task = update_owned(Task, task_id, g.user.id, **values)
+    if task is None:
+        abort(404)
 
-    db.session.add(task)
+    tasks_changed(g.user.id, 'task.updated', [task.id])
     db.session.commit()
 
     return redirect('/')
 
 
-@app.route('/api/tasks/important', methods=['POST'])
+@bp.route('/api/tasks/important', methods=['POST'])
 def star_task():
     """ Add star to task for signed in user """
     if not g.user:
@@ -329,20 +742,18 @@ def star_task():
     # Handle AJAX request from client
     id = request.json.get('id')
 
-    # Update the task depending on important status
-    task = Task.query.get_or_404(id)
-    if not task.important:
-        task.important = True
-    else:
-        task.important = False
+    # Flip the important status in the db, so that toggles can't be lost
+    task = update_owned(Task, id, g.user.id, important=~Task.important)
+    if task is None:
+        abort(404)
 
-    db.session.add(task)
+    tasks_changed(g.user.id, 'task.updated', [task.id])
     db.session.commit()
 
-    return redirect('/tasks/important')
+    return jsonify(id=task.id, important=task.important)
 
 
-@app.route('/api/tasks/completed', methods=['POST'])
+@bp.route('/api/tasks/completed', methods=['POST'])
 def complete_task():
     """ Complete task for signed in user """
     if not g.user:
@@ -351,179 +762,157 @@ def complete_task():
     # Handle AJAX request from client
     id = request.json.get('id')
 
-    # Update the task depending on important status
-    task = Task.query.get_or_404(id)
-    if not task.completed:
-        task.completed = True
-    else:
-        task.completed = False
+    # Flip the completed status in the db, so that toggles can't be lost
+    task = update_owned(Task, id, g.user.id, completed=~Task.completed)
+    if task is None:
+        abort(404)
 
-    db.session.add(task)
+    tasks_changed(g.user.id,
+                  'task.completed' if task.completed else 'task.updated',
+                  [task.id])
     db.session.commit()
 
-    return redirect('/tasks/completed')
+    return jsonify(id=task.id, completed=task.completed)
 
 
-@app.route('/tasks')
-def get_all_tasks():
-    """ Return all tasks for current user"""
+@bp.route('/api/tasks/batch', methods=['POST'])
+def batch_tasks():
+    """ Complete, star, move or delete many tasks for signed in user """
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter(Task.completed != True)
-             .all())
+    # Handle AJAX request from client
+    if not isinstance(request.json, dict):
+        abort(400)
+
+    op = request.json.get('op')
+    ids = request.json.get('ids')
+    if (not isinstance(ids, list)
+            or not all(isinstance(id, int) for id in ids)
+            or len(ids) > current_app.config['BATCH_MAX_TASKS']):
+        abort(400)
 
-    sort = session.get('sort') or 'recent'
+    try:
+        due = request.json.get('due')
+        if due:
+            due = date.fromisoformat(due)
+
+        changed = Task.batch(
+            g.user.id,
+            Task.id.in_(ids),
+            op,
+            group_name=request.json.get('group'),
+            due=due)
+    except (ValueError, TypeError):
+        abort(400)
+
+    tasks_changed(g.user.id, batch_event(op), changed)
+    db.session.commit()
 
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view='all',
-        user=g.user,
-        sort=sort)
+    return jsonify(op=op, ids=changed)
 
 
-@app.route('/tasks/important')
-def get_important_tasks():
-    """ Return important tasks for current user"""
+@bp.route('/tasks')
+@replica_reads
+def get_all_tasks():
+    """ Return all tasks for current user"""
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter_by(important=True)
-             .filter(Task.completed != True)
-             .all())
+    return render_task_view('all')
 
-    sort = session.get('sort') or 'recent'
 
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view='important',
-        user=g.user,
-        sort=sort)
+@bp.route('/tasks/important')
+@replica_reads
+def get_important_tasks():
+    """ Return important tasks for current user"""
+    if not g.user:
+        return redirect("/")
+
+    return render_task_view('important')
 
 
-@app.route('/tasks/completed')
+@bp.route('/tasks/completed')
+@replica_reads
 def get_completed_tasks():
     """ Return completed tasks for current user"""
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter_by(completed=True)
-             .all())
+    return render_task_view('completed')
 
-    sort = session.get('sort') or 'recent'
 
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view='completed',
-        user=g.user,
-        sort=sort)
-
-
-@app.route('/tasks/today')
+@bp.route('/tasks/today')
+@replica_reads
 def get_today_tasks():
     """ Return tasks due today for current user"""
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter(Task.due <= date.today().isoformat())
-             .filter(Task.completed != True)
-             .all())
-
-    sort = session.get('sort') or 'recent'
-
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view='today',
-        user=g.user,
-        sort=sort)
+    return render_task_view('today')
 
 
-@app.route('/tasks/tomorrow')
+@bp.route('/tasks/tomorrow')
+@replica_reads
 def get_tomorrow_tasks():
     """ Return tasks due tomorrow for current user"""
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter(Task.due - timedelta(days=1) == date.today().isoformat())
-             .filter(Task.completed != True)
-             .all())
+    return render_task_view('tomorrow')
 
-    sort = session.get('sort') or 'recent'
 
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view='tomorrow',
-        user=g.user,
-        sort=sort)
-
-
-@app.route('/tasks/later')
+@bp.route('/tasks/later')
+@replica_reads
 def get_later_tasks():
     """ Return tasks due later for current user"""
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter(Task.due - timedelta(days=2) >= date.today().isoformat())
-             .filter(Task.completed != True)
-             .all())
+    return render_task_view('later')
 
-    sort = session.get('sort') or 'recent'
 
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view='later',
-        user=g.user,
-        sort=sort)
-
-
-@app.route('/groups/<int:group_id>')
+@bp.route('/groups/<int:group_id>')
+@replica_reads
 def get_group_tasks(group_id):
     """ Return tasks in a group for current user"""
     if not g.user:
         return redirect("/")
 
-    tasks = (Task
-             .query
-             .filter_by(user_id=g.user.id)
-             .filter_by(group_id=group_id)
-             .filter(Task.completed != True)
-             .all())
+    return render_task_view(group_id)
 
-    sort = session.get('sort') or 'recent'
 
-    return render_template(
-        'home.html',
-        tasks=tasks,
-        view=group_id,
-        user=g.user,
-        sort=sort)
+@bp.route('/api/tasks/due')
+@replica_reads
+def get_due_buckets():
+    """ Return counts and ids of open tasks by when they are due """
+    if not g.user:
+        return redirect("/")
+
+    return jsonify(Task.due_buckets(g.user.id))
 
 
-@app.route('/tasks/<int:task_id>')
+@bp.route('/api/metrics')
+def get_metrics():
+    """ Return the caches, pool and event stream stats of this process
+
+    The stats are of every user, so they are only shown to monitoring that
+    sends the METRICS_TOKEN, and not at all if there is none.
+    """
+    token = current_app.config['METRICS_TOKEN']
+    if not token or not hmac.compare_digest(
+            request.headers.get('Authorization', ''), f'Bearer {token}'):
+        abort(404)
+
+    return jsonify(
+        users=current_app.user_cache.stats(),
+        counts=current_app.counts_cache.stats(),
+        pages=current_app.page_cache.stats(),
+        pool=pool_stats(db.engine),
+        event_streams=current_app.events.stream_count())
+
+
+@bp.route('/tasks/<int:task_id>')
 def edit_task(task_id):
     """ Show task details for current user"""
     if not g.user:
@@ -531,28 +920,131 @@ def edit_task(task_id):
 
     task = Task.query.get_or_404(task_id)
 
-    return render_template('edit_task.html', task=task, user=g.user)
+    return render_template(
+        'edit_task.html',
+        task=task,
+        user=g.user,
+        **sidebar_context())
 
 
-@app.route('/api/tasks/<int:task_id>/delete')
+@bp.route('/api/tasks/<int:task_id>/delete')
 def delete_task(task_id):
     """ Delete task for signed in user """
     if not g.user:
         return redirect("/")
 
-    task = Task.query.get_or_404(task_id)
+    if delete_owned(Task, task_id, g.user.id) is None:
+        abort(404)
 
-    db.session.delete(task)
+    tasks_changed(g.user.id, 'task.deleted', [task_id])
     db.session.commit()
 
     return redirect('/')
 
 
+##########################################################################
+# Live updates
+
+QUICK_VIEWS = ('all', 'important', 'completed', 'today', 'tomorrow', 'later')
+
+
+def parse_view(view):
+    """Return the quick view name or group id of a view parameter."""
+
+    if view in QUICK_VIEWS:
+        return view
+    if view and view.isdigit():
+        return int(view)
+
+    abort(400)
+
+
+@bp.route('/api/events')
+def task_events():
+    """ Stream changes to the tasks and groups of signed in user """
+    if not g.user:
+        return redirect("/")
+
+    user_id = g.user.id
+    broker = current_app.events
+    broker.start()
+    queue = broker.subscribe(user_id)
+
+    # Don't hold a pooled connection for as long as the stream is open
+    db.session.close()
+
+    keepalive = current_app.config['EVENTS_KEEPALIVE_SECONDS']
+    deadline = time.monotonic() + current_app.config['EVENTS_STREAM_SECONDS']
+
+    def stream():
+        try:
+            # Browsers reconnect this long after the stream ends
+            yield 'retry: 2000\n\n'
+
+            while time.monotonic() < deadline:
+                try:
+                    message = queue.get(timeout=keepalive)
+                except Empty:
+                    # Comments keep proxies from closing idle streams
+                    yield ': keep-alive\n\n'
+                    continue
+
+                data = json.dumps(message)
+                yield f"event: {message['event']}\ndata: {data}\n\n"
+        finally:
+            broker.unsubscribe(user_id, queue)
+
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@bp.route('/api/tasks/cards')
+def get_task_cards():
+    """ Render the cards of changed tasks that are listed in a view """
+    if not g.user:
+        return redirect("/")
+
+    view = parse_view(request.args.get('view'))
+    try:
+        ids = [int(id) for id in request.args.get('ids', '').split(',') if id]
+    except ValueError:
+        abort(400)
+
+    if len(ids) > current_app.config['BATCH_MAX_TASKS']:
+        abort(400)
+
+    # Read from the primary, since the change was just committed there
+    tasks = []
+    if ids:
+        query = (Task.rows_for_view(g.user.id, view, get_sort())
+                 .filter(Task.id.in_(ids)))
+        tasks = [TaskRow._make(row) for row in query]
+
+    return render_template(
+        'components/tasks/task_page.html',
+        tasks=tasks,
+        next_cursor=None)
+
+
+@bp.route('/api/sidebar')
+def get_sidebar():
+    """ Render the sidebar of a view with the current groups and counts """
+    if not g.user:
+        return redirect("/")
+
+    return render_template(
+        'components/sidebar.html',
+        view=parse_view(request.args.get('view')),
+        **sidebar_context())
+
+
 ##################################################
 # API groups
 
 
-@app.route('/api/groups/new', methods=['POST'])
+@bp.route('/api/groups/new', methods=['POST'])
 def new_group():
     """ Add new group for signed in user """
     if not g.user:
@@ -564,12 +1056,14 @@ def new_group():
     # Add the new group
     group = Group(name=name, user_id=g.user.id)
     db.session.add(group)
+    db.session.flush()
+    tasks_changed(g.user.id, 'group.created', [group.id])
     db.session.commit()
 
-    return redirect('/')
+    return jsonify(id=group.id, name=group.name), 201
 
 
-@app.route('/groups/<int:group_id>/edit')
+@bp.route('/groups/<int:group_id>/edit')
 def edit_group(group_id):
     """ Edit group for signed in user """
     if not g.user:
@@ -577,10 +1071,14 @@ def edit_group(group_id):
 
     group = Group.query.get_or_404(group_id)
 
-    return render_template('edit_group.html', group=group, user=g.user)
+    return render_template(
+        'edit_group.html',
+        group=group,
+        user=g.user,
+        **sidebar_context())
 
 
-@app.route('/api/groups/<int:group_id>/edit', methods=['POST'])
+@bp.route('/api/groups/<int:group_id>/edit', methods=['POST'])
 def edit_group_submit(group_id):
     """ Update edited group name for signed in user """
     if not g.user:
@@ -589,24 +1087,29 @@ def edit_group_submit(group_id):
     # Handle AJAX request from client
     name = request.form.get('group-name')
 
-    # Add the updated group
-    group = Group.query.get_or_404(group_id)
-    group.name = name
-    db.session.add(group)
+    # Update the group if it belongs to the user
+    group = update_owned(Group, group_id, g.user.id, name=name)
+    if group is None:
+        abort(404)
+
+    tasks_changed(g.user.id, 'group.updated', [group_id])
     db.session.commit()
 
     return redirect(f'/groups/{group_id}')
 
 
-@app.route('/api/groups/<int:group_id>/delete')
+@bp.route('/api/groups/<int:group_id>/delete')
 def delete_group(group_id):
     """ Delete group for signed in user """
     if not g.user:
         return redirect("/")
 
-    group = Group.query.get_or_404(group_id)
+    # Tasks of the group are kept, without a group
+    Task.batch(g.user.id, Task.group_id == group_id, 'group')
+    if delete_owned(Group, group_id, g.user.id) is None:
+        abort(404)
 
-    db.session.delete(group)
+    tasks_changed(g.user.id, 'group.deleted', [group_id])
     db.session.commit()
 
     return redirect('/')
@@ -615,7 +1118,7 @@ def delete_group(group_id):
 # API sorting
 
 
-@app.route('/api/sort/<sort>')
+@bp.route('/api/sort/<sort>')
 def sort_tasks(sort):
     """ Sort tasks by the sorting option """
     if not g.user:
@@ -633,108 +1136,85 @@ def confirm_receipt():
     return ('', 200)
 
 
-@app.route('/slack/tasks', methods=['POST'])
-def slack_get_tasks():
-    """ Get all open tasks for the slack user """
+def slack_command(command):
+    """Turn a function building the reply to a slash command into a view.
+
+    The view verifies that the request came from Slack. When deferring is
+    enabled, it acknowledges the command at once and the reply is built in
+    the background and posted to the response_url of the command, so that
+    slow queries don't run into the 3 second timeout of Slack.
+    """
+
+    @wraps(command)
+    def view():
+        # Verify that the request actually came from Slack through its
+        # signature
+        from slack_sdk.signature import SignatureVerifier
+        signature = SignatureVerifier(os.environ.get('SLACK_SIGNING_SECRET'))
+        if not signature.is_valid_request(
+                request.get_data(
+                    as_text=True),
+                request.headers):
+            return jsonify(
+                response_type='ephemeral',
+                text="Sorry, slash commando, that didn't work. Please try again.",
+            )
 
-    # Confirm receipt to Slack so that no error is shown to user
-    confirm_receipt()
+        form = request.form.to_dict()
 
-    # Verify that the request actually came from Slack through its signature
-    signature = SignatureVerifier(os.environ.get('SLACK_SIGNING_SECRET'))
-    if not signature.is_valid_request(
-            request.get_data(
-                as_text=True),
-            request.headers):
-        return jsonify(
-            response_type='ephemeral',
-            text="Sorry, slash commando, that didn't work. Please try again.",
-        )
+        if current_app.config['SLACK_DEFER_COMMANDS'] and form.get('response_url'):
+            if current_app.command_runner.submit(command, form):
+                # Confirm receipt to Slack so that no error is shown to user
+                return confirm_receipt()
+
+            return jsonify(
+                response_type='ephemeral',
+                text="Dolt is busy right now :hourglass: Please try again in a moment.",
+            )
+
+        return jsonify(**command(form))
+
+    return view
+
+
+def parse_task_filters(text):
+    """Parse the $due, (group) and * filters of a slash command."""
+
+    filters = {}
+
+    # Filter tasks by when they are due
+    if text.find('$') != -1:
+        filters['due'] = text.partition('$')[2].partition(' ')[0].lower()
+
+    # Filter tasks by group
+    if text.find('(') != -1:
+        filters['group_name'] = text.partition('(')[2].partition(')')[0]
+
+    # Filter important tasks
+    if text.find('*') != -1:
+        filters['important'] = True
+
+    return filters
+
+
+@bp.route('/slack/tasks', methods=['POST'])
+@slack_command
+def slack_get_tasks(form):
+    """ Get all open tasks for the slack user """
 
     try:
 
         # Given the slack user id, extract the user and needed data
-        slack_user_id = request.form.get('user_id')
-        text = request.form.get('text')
+        slack_user_id = form.get('user_id')
+        text = form.get('text') or ''
         user = User.query.filter_by(slack_user_id=slack_user_id).first()
+        read_from_replica(user.id)
 
-        # Declare variables to be used for filtering the tasks based on the slack
-        # message
-        due_tasks = None
-        group_tasks = None
-        important_tasks = None
-
-        # Find all tasks due according to parameter
-        if text.find('$') != -1:
-            due = text.partition('$')[2].partition(' ')[0]
-
-            if due.lower() == 'today':
-                due_tasks = (Task
-                             .query
-                             .filter_by(user_id=user.id)
-                             .filter(Task.due <= date.today().isoformat())
-                             .filter(Task.completed != True)
-                             .all())
-
-            if due.lower() == 'tomorrow':
-                due_tasks = (
-                    Task .query .filter_by(
-                        user_id=user.id) .filter(
-                        Task.due -
-                        timedelta(
-                            days=1) == date.today().isoformat()) .filter(
-                        Task.completed != True) .all())
-
-            if due.lower() == 'later':
-                due_tasks = (
-                    Task .query .filter_by(
-                        user_id=user.id) .filter(
-                        Task.due -
-                        timedelta(
-                            days=2) >= date.today().isoformat()) .filter(
-                        Task.completed != True) .all())
-
-        # Find all tasks in group according to parameter
-        if text.find('(') != -1:
-            group = text.partition('(')[2].partition(')')[0]
-
-            group_tasks = (Task
-                           .query
-                           .filter_by(user_id=user.id)
-                           .filter(Task.group == group)
-                           .filter(Task.completed != True)
-                           .all())
-
-        # Find all important tasks according to parameter
-        if text.find('*') != 1:
-
-            important_tasks = (Task
-                               .query
-                               .filter_by(user_id=user.id)
-                               .filter(Task.important)
-                               .filter(Task.completed != True)
-                               .all())
-
-        # Fetch final tasks based on parameters
-        tasks = set()
-        if due_tasks is not None:
-            for task in due_tasks:
-                tasks.add(task)
-
-        if group_tasks is not None:
-            for task in group_tasks:
-                tasks.add(task)
-
-        if important_tasks is not None:
-            for task in important_tasks:
-                tasks.add(task)
-
-        if len(tasks) == 0:
-            tasks = (Task
-                     .query
-                     .filter_by(user_id=user.id)
-                     .filter(Task.completed != True)
-                     .all())
+        # Fetch the open tasks matching any of the parameters in one query
+        tasks = (Task
+                 .rows_for_view(user.id, 'all')
+                 .filter(Task.filter_criteria(**parse_task_filters(text)))
+                 .all())
 
         # Construct the blocks for the slack message
         blocks = [
@@ -768,84 +1248,107 @@ def slack_get_tasks():
             blocks = [{"type": "section", "text": {"type": "mrkdwn",
                                                    "text": "You currently have no open tasks. Nice work! :thumbsup:"}}]
 
-        return jsonify(
-            response_type='in_channel',
-            blocks=blocks,
-        )
     except Exception as e:
         print(e)
 
-        # Indicate unsupported request patterns
-        return make_response("", 404)
+        # Failed blocks
+        blocks = [
+            {
+                "type": "section",
+                "text": {
+                    "type": "mrkdwn",
+                    "text": "Sorry, something went wrong :worried: Please check your parameters and try again!"
+                }
+            }
+        ]
 
+    return dict(
+        response_type='in_channel',
+        blocks=blocks,
+    )
 
-@app.route('/slack/tasks/new', methods=['POST'])
-def slack_add_task():
-    """ Add new task for the slack user """
 
-    # Confirm receipt to Slack so that no error is shown to user
-    confirm_receipt()
+def split_task_specs(text):
+    """Split a slash command into one part per task.
 
-    # Verify that the request actually came from Slack through its signature
-    signature = SignatureVerifier(os.environ.get('SLACK_SIGNING_SECRET'))
-    if not signature.is_valid_request(
-            request.get_data(
-                as_text=True),
-            request.headers):
-        return jsonify(
-            response_type='ephemeral',
-            text="Sorry, slash commando, that didn't work. Please try again.",
-        )
+    Tasks are separated by new lines or by semicolons outside of quotes.
+    """
+
+    specs = []
+    spec = ''
+    quoted = False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        if char in '\n;' and not quoted:
+            specs.append(spec)
+            spec = ''
+        else:
+            spec += char
+    specs.append(spec)
+
+    return [spec for spec in specs if spec.count('"') >= 2]
+
+
+def parse_new_task(text):
+    """Parse the title and optional parameters of a new task."""
+
+    task = {}
+
+    # Parse the title from the slack text
+    task['title'] = text.partition('"')[2].partition('"')[0]
+
+    # Parse the description from the slack text
+    if text.count('"') == 4:
+        task['description'] = text.partition('"')[2].partition('"')[
+            2].partition('"')[2].partition('"')[0]
+
+    # Parse the due date from the slack text
+    if text.find('$') != -1:
+        task['due'] = text.partition('$')[2].partition(' ')[0]
+
+    # Parse with the task is important from the slack text
+    if text.find('*') != -1:
+        task['important'] = True
+
+    # Parse the group from the slack text
+    if text.find('(') != -1:
+        task['group_name'] = text.partition('(')[2].partition(')')[0]
+
+    return task
+
+
+@bp.route('/slack/tasks/new', methods=['POST'])
+@slack_command
+def slack_add_task(form):
+    """ Add new task for the slack user """
 
     # Given the slack user id, extract the user and needed data
-    slack_user_id = request.form.get('user_id')
-    text = request.form.get('text')
+    slack_user_id = form.get('user_id')
+    text = form.get('text') or ''
     user = User.query.filter_by(slack_user_id=slack_user_id).first()
 
-    try:
-        # Declare optional variables to be used for the new task based on the
-        # slack message
-        description = ''
-        due = Task.due.default.arg
-        important = Task.important.default.arg
-        group_name = None
-
-        # Parse the title from the slack text
-        title = text.partition('"')[2].partition('"')[0]
-
-        # Parse the description from the slack text
-        if text.count('"') == 4:
-            description = text.partition('"')[2].partition('"')[
-                2].partition('"')[2].partition('"')[0]
-
-        # Parse the due date from the slack text
-        if text.find('$') != -1:
-            due = text.partition('$')[2].partition(' ')[0]
-
-        # Parse with the task is important from the slack text
-        if text.find('*') != -1:
-            important = True
-
-        # Parse the group from the slack text
-        if text.find('(') != -1:
-            group_name = text.partition('(')[2].partition(')')[0]
-
-        # Add the task depending on the group
-        if group_name is None:
-            task = Task(title=title, description=description,
-                        due=due, important=important, user_id=user.id)
-        else:
-            group = Group.query.filter_by(name=group_name).first()
-            task = Task(title=title, description=description,
-                        due=due, group_id=group.id, important=important, user_id=user.id)
+    specs = split_task_specs(text)
+    if not specs:
+        return dict(
+            response_type='ephemeral',
+            text='Use /dolt.task with a title in quotes, like /dolt.task "Order pizza" $tomorrow *',
+        )
 
-        # Add the new task
-        db.session.add(task)
+    try:
+        # Add all tasks of the slack message at once
+        tasks = [parse_new_task(spec) for spec in specs]
+        ids = Task.create_many(user.id, tasks)
+        tasks_changed(user.id, 'task.created', ids)
         db.session.commit()
 
         # Success blocks
+        if len(tasks) == 1:
+            message = "Success! Your new task is added, now get to work :muscle:"
+        else:
+            message = f"Success! Your {len(tasks)} new tasks are added, now get to work :muscle:"
         blocks = [{"type": "section", "text": {"type": "mrkdwn",
-                                               "text": "Success! Your new task is added, now get to work :muscle:"}}]
+                                               "text": message}}]
 
     except Exception as e:
 
@@ -862,39 +1365,86 @@ def slack_add_task():
             }
         ]
 
-    return jsonify(
+    return dict(
         response_type='in_channel',
         blocks=blocks,
     )
 
 
-@app.route('/slack/groups', methods=['POST'])
-def slack_get_groups():
-    """ Get all groups for the slack user """
+@bp.route('/slack/tasks/batch', methods=['POST'])
+@slack_command
+def slack_batch_tasks(form):
+    """ Complete, star, unstar or delete open tasks matching filters """
+
+    # Given the slack user id, extract the user and needed data
+    slack_user_id = form.get('user_id')
+    text = form.get('text') or ''
+    user = User.query.filter_by(slack_user_id=slack_user_id).first()
 
-    # Confirm receipt to Slack so that no error is shown to user
-    confirm_receipt()
+    if user is None:
+        return dict(
+            response_type='ephemeral',
+            text="Sign in to Dolt with Slack before changing your tasks from Slack",
+        )
+
+    # The operation comes first, followed by the same filters as /dolt
+    op = text.partition(' ')[0].lower()
+    filters = parse_task_filters(text)
+    past_tense = {'complete': 'completed', 'star': 'starred',
+                  'unstar': 'unstarred', 'delete': 'deleted'}
+
+    # Require filters so that a typo can't change every open task
+    if op not in past_tense or not filters:
+        return dict(
+            response_type='ephemeral',
+            text="Use /dolt.batch with complete, star, unstar or delete followed by filters, like /dolt.batch complete $today (work)",
+        )
 
-    # Verify that the request actually came from Slack through its signature
-    signature = SignatureVerifier(os.environ.get('SLACK_SIGNING_SECRET'))
-    if not signature.is_valid_request(
-            request.get_data(
-                as_text=True),
-            request.headers):
-        return jsonify(
+    # An unknown $due would match nothing and so drop out of the filters
+    if 'due' in filters and filters['due'] not in Task.DUE_FILTERS:
+        return dict(
             response_type='ephemeral',
-            text="Sorry, slash commando, that didn't work. Please try again.",
+            text=f"Unknown filter ${filters['due']}, use $today, $tomorrow or $later",
         )
 
+    # Change only the tasks matching every filter
+    changed = Task.batch(
+        user.id,
+        db.and_(~Task.completed,
+                Task.filter_criteria(**filters, match_all=True)),
+        op)
+
+    tasks_changed(user.id, batch_event(op), changed)
+    db.session.commit()
+
+    blocks = [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": f"Done! {len(changed)} tasks {past_tense[op]} :white_check_mark:"
+            }
+        }
+    ]
+
+    return dict(
+        response_type='in_channel',
+        blocks=blocks,
+    )
+
+
+@bp.route('/slack/groups', methods=['POST'])
+@slack_command
+def slack_get_groups(form):
+    """ Get all groups for the slack user """
+
     # Given the slack user id, extract the user and needed data
-    slack_user_id = request.form.get('user_id')
+    slack_user_id = form.get('user_id')
     user = User.query.filter_by(slack_user_id=slack_user_id).first()
+    read_from_replica(user.id)
 
     # Fetch all groups for slack user
-    groups = (Group
-              .query
-              .filter_by(user_id=user.id)
-              .all())
+    groups = Group.for_user(user.id).all()
 
     # Construct the blocks for the slack message
     blocks = [
@@ -935,39 +1485,28 @@ def slack_get_groups():
             }
         ]
 
-    return jsonify(
+    return dict(
         response_type='in_channel',
         blocks=blocks,
     )
 
 
-@app.route('/slack/groups/new', methods=['POST'])
-def slack_add_group():
+@bp.route('/slack/groups/new', methods=['POST'])
+@slack_command
+def slack_add_group(form):
     """ Add new group for the slack user """
 
-    # Confirm receipt to Slack so that no error is shown to user
-    confirm_receipt()
-
-    # Verify that the request actually came from Slack through its signature
-    signature = SignatureVerifier(os.environ.get('SLACK_SIGNING_SECRET'))
-    if not signature.is_valid_request(
-            request.get_data(
-                as_text=True),
-            request.headers):
-        return jsonify(
-            response_type='ephemeral',
-            text="Sorry, slash commando, that didn't work. Please try again.",
-        )
-
     # Given the slack user id, extract the user and needed data
-    slack_user_id = request.form.get('user_id')
-    text = request.form.get('text')
+    slack_user_id = form.get('user_id')
+    text = form.get('text')
     user = User.query.filter_by(slack_user_id=slack_user_id).first()
 
     try:
         # Add the new group
         group = Group(name=text, user_id=user.id)
         db.session.add(group)
+        db.session.flush()
+        tasks_changed(user.id, 'group.created', [group.id])
         db.session.commit()
 
         # Success blocks
@@ -996,7 +1535,7 @@ def slack_add_group():
             }
         ]
 
-    return jsonify(
+    return dict(
         response_type='in_channel',
         blocks=blocks,
     )
@@ -0,0 +1,115 @@
+"""Response compression and fingerprinted static files for Dolt."""
+
+from functools import lru_cache
+import gzip
+import hashlib
+import os
+
+from flask import current_app, request
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSED_MIMETYPES = frozenset({'text/html', 'application/json'})
+
+# Fingerprinted static files never change, so browsers may keep them a year
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def init_assets(app):
+    """Compress responses and fingerprint static files of app."""
+
+    app.config.setdefault('COMPRESS_MIN_SIZE', 500)
+    app.config.setdefault('COMPRESS_LEVEL', 6)
+    app.config.setdefault('COMPRESS_BROTLI_QUALITY', 4)
+
+    app.url_defaults(add_static_version)
+    app.after_request(cache_static_file)
+    app.after_request(compress_response)
+
+
+@lru_cache(maxsize=256)
+def file_version(path, mtime):
+    """Return a short hash of the contents of a file.
+
+    The modification time is part of the cache key, so that edited files
+    get a new version without restarting the app.
+    """
+
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:12]
+
+
+def static_version(filename):
+    """Return the version of a static file, or None if it doesn't exist."""
+
+    path = os.path.join(current_app.static_folder, filename)
+    try:
+        return file_version(path, os.stat(path).st_mtime)
+    except OSError:
+        return None
+
+
+def add_static_version(endpoint, values):
+    """Add ?v=<hash of the file> to every url_for('static', ...)."""
+
+    if endpoint != 'static' or 'v' in values or 'filename' not in values:
+        return
+
+    version = static_version(values['filename'])
+    if version is not None:
+        values['v'] = version
+
+
+def cache_static_file(response):
+    """Let browsers keep static files requested with their current version."""
+
+    if (request.endpoint == 'static' and response.status_code == 200
+            and request.args.get('v')
+            and request.args['v'] == static_version(
+                request.view_args['filename'])):
+        response.headers['Cache-Control'] = IMMUTABLE
+
+    return response
+
+
+def compress_response(response):
+    """Compress large HTML and JSON responses if the client accepts it.
+
+    Brotli is used if it is installed and accepted, gzip otherwise. Streamed
+    and passed-through responses, such as files and event streams, are left
+    alone, since compressing them would mean buffering them.
+    """
+
+    if (response.status_code != 200
+            or response.mimetype not in COMPRESSED_MIMETYPES
+            or response.direct_passthrough
+            or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+        return response
+
+    # Responses differ by encoding even if this one is not compressed
+    response.vary.add('Accept-Encoding')
+
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        data = brotli.compress(
+            data, quality=current_app.config['COMPRESS_BROTLI_QUALITY'])
+        encoding = 'br'
+    elif accepted['gzip']:
+        data = gzip.compress(
+            data, compresslevel=current_app.config['COMPRESS_LEVEL'])
+        encoding = 'gzip'
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+
+    return response
@@ -0,0 +1,47 @@
+"""Benchmark cold import and worker boot of the app."""
+
+# run this benchmark like:
+#
+#    python benchmarks/bench_startup.py
+#
+# Every run starts a fresh interpreter, so that nothing is imported yet, and
+# reports the median time to import the app module and to create the app
+# with create_app, which is what each gunicorn worker does when it boots.
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RUNS = 10
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+PROBE = """
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.create_app('production')
+created = time.perf_counter()
+print(json.dumps([imported - start, created - imported]))
+"""
+
+
+def run_once():
+    """Return the import and create_app seconds of a fresh interpreter."""
+
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, check=True,
+        capture_output=True, text=True).stdout
+
+    return json.loads(output.splitlines()[-1])
+
+
+if __name__ == '__main__':
+    runs = [run_once() for _ in range(RUNS)]
+
+    for name, times in zip(['import app', 'create_app()'], zip(*runs)):
+        print(f'{name:15} {statistics.median(times) * 1000:8.1f} ms median '
+              f'of {RUNS} runs')
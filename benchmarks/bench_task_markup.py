@@ -0,0 +1,60 @@
+"""Benchmark the size and render time of task list markup."""
+
+# run this benchmark like:
+#
+#    python benchmarks/bench_task_markup.py [TEMPLATE_DIR]
+#
+# It renders a page of TASKS task cards with the templates in TEMPLATE_DIR
+# (the app's templates by default) and reports the bytes per task, before
+# and after gzip, and the render time per task. Pass the templates of an
+# older checkout to compare the two.
+
+import gzip
+import os
+import sys
+import time
+from datetime import date, datetime
+
+from jinja2 import Environment, FileSystemLoader
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from models import TaskRow
+
+TASKS = 500
+RENDERS = 20
+
+
+def make_tasks():
+    """Return TASKS rows with a mix of the states a card can show."""
+
+    return [TaskRow(id=i, title=f'task {i}', due=date.today(),
+                    important=i % 5 == 0, completed=i % 7 == 0,
+                    has_description=i % 2 == 0, created_at=datetime.now(),
+                    group_name=f'group {i % 10}')
+            for i in range(TASKS)]
+
+
+def measure(template_dir):
+    """Return the page, its gzipped size and the seconds per render."""
+
+    env = Environment(loader=FileSystemLoader(template_dir), autoescape=True)
+    template = env.get_template('components/tasks/task_page.html')
+    tasks = make_tasks()
+
+    start = time.perf_counter()
+    for _ in range(RENDERS):
+        page = template.render(tasks=tasks, next_cursor=None)
+    seconds = (time.perf_counter() - start) / RENDERS
+
+    return page.encode(), len(gzip.compress(page.encode())), seconds
+
+
+if __name__ == '__main__':
+    template_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+        os.path.dirname(__file__), '..', 'templates')
+
+    page, gzipped, seconds = measure(template_dir)
+    print(f'{TASKS} tasks: {len(page) / TASKS:8.0f} B/task '
+          f'{gzipped / TASKS:8.0f} B/task gzipped '
+          f'{seconds / TASKS * 1e6:8.1f} us/task')
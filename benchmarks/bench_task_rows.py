@@ -0,0 +1,96 @@
+"""Benchmark ORM entities against TaskRow projections for task lists."""
+
+# run this benchmark like:
+#
+#    python benchmarks/bench_task_rows.py
+#
+# It seeds a user with 10k open tasks in the dolt_bench database (or the one
+# in BENCH_DATABASE_URL) and reports the CPU time and peak memory of loading
+# the whole list once per request, with and without full ORM entities.
+
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+# Always use the bench database, since seeding drops all tables
+os.environ['DATABASE_URL'] = os.environ.get(
+    'BENCH_DATABASE_URL', 'postgresql:///dolt_bench')
+
+from app import create_app
+from models import db, Group, Task, TaskRow, User
+
+app = create_app('production')
+
+TASKS = 10000
+REQUESTS = 20
+USER_ID = 1
+
+
+def seed():
+    """Create a user with TASKS open tasks spread over a few groups."""
+
+    db.drop_all()
+    db.create_all()
+
+    user = User(id=USER_ID, name='Bench', email='bench@example.com',
+                slack_user_id='bench', slack_team_id='bench',
+                slack_img_url='bench.png')
+    db.session.add(user)
+    for i in range(10):
+        db.session.add(Group(id=i + 1, name=f'group {i}', user_id=USER_ID))
+    db.session.commit()
+
+    db.session.bulk_insert_mappings(Task, [
+        dict(title=f'task {i}', description='a description' if i % 2 else None,
+             important=i % 5 == 0, group_id=i % 10 + 1, user_id=USER_ID)
+        for i in range(TASKS)])
+    db.session.commit()
+    db.session.execute('ANALYZE')
+
+
+def load_entities():
+    # Full ORM entities with their groups, as the views used to load them
+    tasks = (Task.query
+             .options(db.joinedload(Task.group))
+             .filter(Task.user_id == USER_ID, *Task.view_criteria('all'))
+             .order_by(*Task.sort_order('recent'))
+             .all())
+    return [(t.title, t.due, t.important, t.group and t.group.name)
+            for t in tasks]
+
+
+def load_rows():
+    rows = [TaskRow._make(row) for row in Task.rows_for_view(USER_ID, 'all')]
+    return [(t.title, t.due, t.important, t.group_name) for t in rows]
+
+
+def measure(load):
+    """Return the CPU seconds and peak bytes per simulated request."""
+
+    cpu = 0
+    peak = 0
+    for _ in range(REQUESTS):
+        # Each request starts with an empty session, like in the app
+        db.session.remove()
+
+        tracemalloc.start()
+        start = time.process_time()
+        load()
+        cpu += time.process_time() - start
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    return cpu / REQUESTS, peak
+
+
+if __name__ == '__main__':
+    seed()
+
+    for name, load in [('ORM entities', load_entities),
+                       ('TaskRow projection', load_rows)]:
+        cpu, peak = measure(load)
+        print(f'{name:20} {cpu * 1000:8.1f} ms CPU '
+              f'{peak / 1024 / 1024:8.1f} MiB peak per request')
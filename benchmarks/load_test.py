@@ -0,0 +1,158 @@
+"""Load test the gunicorn worker models under slow Postgres and Slack."""
+
+# run this load test like:
+#
+#    python benchmarks/load_test.py [WORKER_CLASS ...]
+#
+# For every worker class (gevent, gthread and sync by default) it starts
+# gunicorn with gunicorn.conf.py, adds LOAD_DB_LATENCY seconds to every query
+# and points the Slack client at a local fake Slack answering after
+# LOAD_SLACK_LATENCY seconds. CLIENTS concurrent clients then request pages
+# that query the database (the dolt_bench database, or the one in
+# BENCH_DATABASE_URL) or call Slack, and the throughput and latencies are
+# reported.
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import requests
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+DB_LATENCY = float(os.environ.get('LOAD_DB_LATENCY', 0.05))
+SLACK_LATENCY = float(os.environ.get('LOAD_SLACK_LATENCY', 0.2))
+CLIENTS = int(os.environ.get('LOAD_CLIENTS', 32))
+DURATION = int(os.environ.get('LOAD_DURATION', 15))
+WORKERS = os.environ.get('LOAD_WORKERS', '2')
+PORT = 8765
+
+PATHS = ['/load/db', '/load/db', '/load/slack', '/']
+
+
+def create_load_app():
+    """Create the app with slow queries and routes that use db and Slack."""
+
+    from flask import current_app, jsonify
+    from sqlalchemy import event
+
+    from app import create_app
+    from models import db
+
+    app = create_app('production')
+
+    @event.listens_for(db.get_engine(app), 'before_cursor_execute')
+    def slow_query(*args):
+        time.sleep(DB_LATENCY)
+
+    @app.route('/load/db')
+    def load_db():
+        return jsonify(db.session.execute('SELECT 1').scalar())
+
+    @app.route('/load/slack')
+    def load_slack():
+        return jsonify(current_app.slack.auth_test('xoxb-load'))
+
+    return app
+
+
+class SlowSlack(BaseHTTPRequestHandler):
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        time.sleep(SLACK_LATENCY)
+
+        body = b'{"ok": true, "bot_id": "B1"}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_gunicorn(worker_class, slack_url):
+    env = dict(
+        os.environ,
+        DATABASE_URL=os.environ.get(
+            'BENCH_DATABASE_URL', 'postgresql:///dolt_bench'),
+        SLACK_API_URL=slack_url,
+        PORT=str(PORT),
+        WEB_CONCURRENCY=WORKERS,
+        GUNICORN_WORKER_CLASS=worker_class)
+
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--config', 'gunicorn.conf.py',
+         '--pythonpath', 'benchmarks', 'load_test:create_load_app()'],
+        cwd=ROOT, env=env, stderr=subprocess.DEVNULL)
+
+    # Wait until the workers answer
+    for _ in range(100):
+        try:
+            requests.get(f'http://127.0.0.1:{PORT}/', timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.1)
+
+    process.terminate()
+    raise RuntimeError('gunicorn did not start')
+
+
+def client(deadline):
+    """Request the load paths until the deadline, returning the latencies."""
+
+    http = requests.Session()
+    latencies = []
+    errors = 0
+    i = 0
+    while time.monotonic() < deadline:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        start = time.monotonic()
+        try:
+            response = http.get(f'http://127.0.0.1:{PORT}{path}', timeout=30)
+            response.raise_for_status()
+        except requests.RequestException:
+            errors += 1
+            continue
+        latencies.append(time.monotonic() - start)
+
+    return latencies, errors
+
+
+def run(worker_class, slack_url):
+    process = start_gunicorn(worker_class, slack_url)
+    try:
+        deadline = time.monotonic() + DURATION
+        with ThreadPoolExecutor(CLIENTS) as pool:
+            results = list(pool.map(client, [deadline] * CLIENTS))
+    finally:
+        process.terminate()
+        process.wait()
+
+    latencies = sorted(l for result in results for l in result[0])
+    errors = sum(result[1] for result in results)
+    p95 = latencies[int(len(latencies) * 0.95)] if latencies else 0
+
+    print(f'{worker_class:8} {len(latencies) / DURATION:8.1f} req/s '
+          f'p50 {statistics.median(latencies or [0]) * 1000:7.1f} ms '
+          f'p95 {p95 * 1000:7.1f} ms {errors} errors')
+
+
+if __name__ == '__main__':
+    slack = ThreadingHTTPServer(('127.0.0.1', 0), SlowSlack)
+    Thread(target=slack.serve_forever, daemon=True).start()
+    slack_url = f'http://127.0.0.1:{slack.server_port}/api/'
+
+    print(f'{CLIENTS} clients, {WORKERS} workers, {DB_LATENCY * 1000:.0f} ms '
+          f'per query, {SLACK_LATENCY * 1000:.0f} ms per Slack call')
+    for worker_class in sys.argv[1:] or ['gevent', 'gthread', 'sync']:
+        run(worker_class, slack_url)
+
+    slack.shutdown()
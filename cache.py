@@ -0,0 +1,111 @@
+"""Process-local caches for Dolt."""
+
+from collections import OrderedDict
+from threading import Lock
+import time
+
+
+class LRUCache:
+    """ Thread-safe cache that evicts the least recently used entries
+
+    Entries older than ttl seconds are treated as missing, so that data
+    changed by another worker process is picked up eventually. If maxbytes
+    is given, entries are also evicted to keep the total size of the values,
+    as measured by sizeof, under it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, maxbytes=None, sizeof=len):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.maxbytes = maxbytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        """ Return the value cached for key, or default """
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires, size = entry
+            if expires is not None and expires < time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """ Cache value for key, evicting the oldest entries if full """
+
+        if self.maxsize <= 0:
+            return
+
+        size = self.sizeof(value) if self.maxbytes is not None else 0
+        if self.maxbytes is not None and size > self.maxbytes:
+            return
+
+        expires = time.monotonic() + self.ttl if self.ttl else None
+
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, expires, size)
+            self._bytes += size
+
+            while (len(self._entries) > self.maxsize
+                   or self.maxbytes is not None
+                   and self._bytes > self.maxbytes):
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key):
+        """ Remove key from the cache if it is there """
+
+        with self._lock:
+            self._remove(key)
+
+    def delete_where(self, predicate):
+        """ Remove every key for which predicate(key) is true """
+
+        with self._lock:
+            for key in [key for key in self._entries if predicate(key)]:
+                self._remove(key)
+
+    def clear(self):
+        """ Remove all entries """
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """ Return the size and hit rate of the cache """
+
+        with self._lock:
+            lookups = self.hits + self.misses
+            return dict(
+                entries=len(self._entries),
+                bytes=self._bytes,
+                hits=self.hits,
+                misses=self.misses,
+                evictions=self.evictions,
+                hit_rate=self.hits / lookups if lookups else None)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,108 @@
+"""Configuration profiles for Dolt."""
+
+import os
+
+
+class Config:
+    """ Settings shared by every profile, read from the environment
+
+    The environment is read when a profile is instantiated rather than on
+    import, so that a .env file loaded by create_app is taken into account.
+    """
+
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    SQLALCHEMY_ECHO = False
+    DEBUG_TB_ENABLED = False
+    DEBUG_TB_INTERCEPT_REDIRECTS = False
+    SLACK_STATE_TTL = 300
+
+    def __init__(self):
+        env = os.environ
+
+        # Get DB_URI from environ variable (useful for production/testing) or,
+        # if not set there, use development local db.
+        self.SQLALCHEMY_DATABASE_URI = env.get(
+            'DATABASE_URL', 'postgres:///dolt')
+
+        # Connections per worker process. In PgBouncer mode connections are
+        # not pooled in the app, so that a transaction-mode PgBouncer can.
+        self.DB_POOL_SIZE = int(env.get('DB_POOL_SIZE', 5))
+        self.DB_MAX_OVERFLOW = int(env.get('DB_MAX_OVERFLOW', 5))
+        self.DB_POOL_TIMEOUT = int(env.get('DB_POOL_TIMEOUT', 10))
+        self.DB_POOL_RECYCLE = int(env.get('DB_POOL_RECYCLE', 1800))
+        self.DB_POOL_PRE_PING = (
+            env.get('DB_POOL_PRE_PING', 'true').lower() == 'true')
+        self.DB_STATEMENT_TIMEOUT = int(env.get('DB_STATEMENT_TIMEOUT', 15000))
+        self.DB_PGBOUNCER = env.get('DB_PGBOUNCER', 'false').lower() == 'true'
+
+        # Read-only views read from the replica, if there is one, unless the
+        # user changed something in the last REPLICA_PIN_SECONDS
+        self.REPLICA_DATABASE_URL = env.get('REPLICA_DATABASE_URL')
+        self.REPLICA_PIN_SECONDS = int(env.get('REPLICA_PIN_SECONDS', 10))
+
+        # Change events are listened for on a connection of their own, which
+        # must not go through a transaction-mode PgBouncer
+        self.EVENTS_DATABASE_URL = env.get('EVENTS_DATABASE_URL')
+        # Streams end after EVENTS_STREAM_SECONDS and browsers reconnect, so
+        # that no request holds a worker thread forever
+        self.EVENTS_STREAM_SECONDS = int(env.get('EVENTS_STREAM_SECONDS', 300))
+        self.EVENTS_KEEPALIVE_SECONDS = int(
+            env.get('EVENTS_KEEPALIVE_SECONDS', 15))
+
+        self.SECRET_KEY = env.get('SECRET_KEY', "secret123")
+        # Bearer token of /api/metrics, which is off without one
+        self.METRICS_TOKEN = env.get('METRICS_TOKEN')
+        self.TASKS_PAGE_SIZE = int(env.get('TASKS_PAGE_SIZE', 50))
+        self.BATCH_MAX_TASKS = int(env.get('BATCH_MAX_TASKS', 1000))
+        # Changes the ETags of all pages with every release of the app
+        self.ETAG_SALT = env.get('HEROKU_RELEASE_VERSION', '')
+        self.USER_CACHE_SIZE = int(env.get('USER_CACHE_SIZE', 1024))
+        self.USER_CACHE_TTL = int(env.get('USER_CACHE_TTL', 300))
+        self.COUNTS_CACHE_TTL = int(env.get('COUNTS_CACHE_TTL', 60))
+        self.PAGE_CACHE_SIZE = int(env.get('PAGE_CACHE_SIZE', 512))
+        self.PAGE_CACHE_BYTES = int(
+            env.get('PAGE_CACHE_BYTES', 64 * 1024 * 1024))
+        self.SLACK_DEFER_COMMANDS = (
+            env.get('SLACK_DEFER_COMMANDS', 'true').lower() == 'true')
+        self.SLACK_COMMAND_WORKERS = int(env.get('SLACK_COMMAND_WORKERS', 4))
+        self.SLACK_COMMAND_QUEUE = int(env.get('SLACK_COMMAND_QUEUE', 32))
+        self.SLACK_API_URL = env.get('SLACK_API_URL', 'https://slack.com/api/')
+        self.SLACK_TIMEOUT = float(env.get('SLACK_TIMEOUT', 5))
+        self.SLACK_MAX_RETRIES = int(env.get('SLACK_MAX_RETRIES', 2))
+        self.SLACK_BREAKER_FAILURES = int(env.get('SLACK_BREAKER_FAILURES', 5))
+        self.SLACK_BREAKER_RESET = int(env.get('SLACK_BREAKER_RESET', 30))
+
+
+class ProductionConfig(Config):
+    """ Settings for the deployed app """
+
+
+class DevelopmentConfig(Config):
+    """ Settings for running the app locally, with the debug toolbar """
+
+    DEBUG = True
+    DEBUG_TB_ENABLED = True
+
+
+class TestingConfig(Config):
+    """ Settings for the test suite """
+
+    # Make Flask errors be real errors, rather than HTML pages with error info
+    TESTING = True
+
+    # Don't req CSRF for testing
+    WTF_CSRF_ENABLED = False
+
+    def __init__(self):
+        super().__init__()
+
+        # Use test database and don't clutter tests with SQL
+        self.SQLALCHEMY_DATABASE_URI = os.environ.get(
+            'TEST_DATABASE_URL', 'postgresql:///dolt_test')
+
+
+CONFIGS = {
+    'production': ProductionConfig,
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+}
@@ -0,0 +1,176 @@
+"""Live change events for Dolt, fanned out through Postgres LISTEN/NOTIFY."""
+
+from collections import defaultdict
+from queue import Empty, Full, Queue
+from threading import Event, Lock, Thread
+import json
+import logging
+import select
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+from models import db
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'dolt_events'
+
+# Payloads of NOTIFY are limited to 8000 bytes, so larger changes only tell
+# clients to reload
+MAX_EVENT_IDS = 200
+
+RELOAD = {'event': 'reload'}
+
+
+def notify_change(user_id, event, ids=()):
+    """Send a change event to every worker when the transaction commits."""
+
+    ids = list(ids)
+    payload = json.dumps(dict(
+        user_id=user_id,
+        event=event,
+        ids=ids if len(ids) <= MAX_EVENT_IDS else None))
+
+    db.session.execute(
+        db.select([db.func.pg_notify(CHANNEL, payload)]))
+
+
+class EventBroker:
+    """ Deliver change events of users to the streams open in this process
+
+    A single thread listens for the events of all workers on one Postgres
+    connection, and puts each event on the queues of the streams of its
+    user. The thread is only started with the first stream, so workers that
+    serve none hold no connection.
+    """
+
+    def __init__(self, database_url, queue_size=100):
+        self.database_url = database_url
+        self.queue_size = queue_size
+        self._streams = defaultdict(set)
+        self._lock = Lock()
+        self._thread = None
+        self._stopped = Event()
+        # Set while events are being listened for
+        self.listening = Event()
+
+    def start(self):
+        """ Start listening for events, if not listening yet """
+
+        with self._lock:
+            if self._thread is None:
+                self._thread = Thread(target=self._listen, daemon=True,
+                                      name='dolt-events')
+                self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def subscribe(self, user_id):
+        """ Return a queue receiving the events of a user """
+
+        queue = Queue(self.queue_size)
+        with self._lock:
+            self._streams[user_id].add(queue)
+
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self._lock:
+            self._streams[user_id].discard(queue)
+            if not self._streams[user_id]:
+                del self._streams[user_id]
+
+    def stream_count(self):
+        with self._lock:
+            return sum(len(queues) for queues in self._streams.values())
+
+    def publish(self, user_id, message):
+        """ Put a message on every queue of a user
+
+        A stream that falls behind has its queue replaced by a reload
+        message, since the events it missed can't be patched in anymore.
+        """
+
+        with self._lock:
+            queues = list(self._streams.get(user_id, ()))
+
+        for queue in queues:
+            try:
+                queue.put_nowait(message)
+            except Full:
+                self._drain(queue)
+                queue.put_nowait(RELOAD)
+
+    def publish_all(self, message):
+        with self._lock:
+            user_ids = list(self._streams)
+
+        for user_id in user_ids:
+            self.publish(user_id, message)
+
+    def dispatch(self, payload):
+        """ Publish the event in a NOTIFY payload to its user """
+
+        try:
+            message = json.loads(payload)
+            user_id = message.pop('user_id')
+        except (ValueError, KeyError):
+            logger.warning("Ignoring malformed event %r", payload)
+            return
+
+        if message.get('ids') is None:
+            message = RELOAD
+
+        self.publish(user_id, message)
+
+    def _listen(self):
+        """ Dispatch notifications until stopped, reconnecting on errors """
+
+        engine = create_engine(self.database_url, poolclass=NullPool)
+        retry = 1
+        reconnect = False
+
+        while not self._stopped.is_set():
+            try:
+                conn = engine.raw_connection()
+            except Exception:
+                logger.exception("Connecting for events failed")
+                self._stopped.wait(retry)
+                retry = min(retry * 2, 30)
+                continue
+
+            try:
+                dbapi_conn = conn.connection
+                dbapi_conn.autocommit = True
+                dbapi_conn.cursor().execute(f'LISTEN {CHANNEL}')
+                self.listening.set()
+                retry = 1
+
+                # Events sent while reconnecting are lost
+                if reconnect:
+                    self.publish_all(RELOAD)
+                reconnect = True
+
+                while not self._stopped.is_set():
+                    if select.select([dbapi_conn], [], [], 5) == ([], [], []):
+                        continue
+
+                    dbapi_conn.poll()
+                    while dbapi_conn.notifies:
+                        self.dispatch(dbapi_conn.notifies.pop(0).payload)
+            except Exception:
+                logger.exception("Listening for events failed")
+                self._stopped.wait(retry)
+            finally:
+                self.listening.clear()
+                conn.close()
+
+    @staticmethod
+    def _drain(queue):
+        while True:
+            try:
+                queue.get_nowait()
+            except Empty:
+                return
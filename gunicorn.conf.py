@@ -0,0 +1,86 @@
+"""Gunicorn settings for Dolt.
+
+Every setting can be overridden from the environment, so that the worker
+model can be tuned per dyno without a deploy.
+"""
+
+import importlib.util
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Requests mostly wait on Postgres and Slack, so each worker serves several
+# at once: in greenlets with gevent, or in threads with gthread. Streams of
+# live updates stay open for minutes, which only gevent can serve cheaply;
+# with gthread every open tab holds one of the threads.
+worker_class = os.environ.get(
+    'GUNICORN_WORKER_CLASS',
+    'gevent' if importlib.util.find_spec('gevent') else 'gthread')
+
+# Patch before the app is preloaded, so that the ssl, requests and psycopg2
+# modules it imports and the locks and queues built for every worker all
+# cooperate with gevent. The gevent worker only patches itself after
+# forking, which is too late for anything already imported or created.
+if worker_class == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+
+# Only used by gthread workers
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Only used by gevent workers. Most of these greenlets are open streams of
+# live updates, which hold no database connection while they wait, so the
+# pool of DB_POOL_SIZE + DB_MAX_OVERFLOW connections per worker is far
+# smaller. Requests beyond it wait up to DB_POOL_TIMEOUT for a connection;
+# if /api/metrics shows pool timeouts, grow the pool (within the connection
+# limit of Postgres over all workers) or use DB_PGBOUNCER.
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# Import the app once in the master, so that workers fork ready to serve
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Recycle workers now and then to bound the growth of their caches, staggered
+# so that they don't all restart at once
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# The Heroku router keeps connections open for up to 90 seconds
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 20))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')
+
+
+def post_worker_init(worker):
+    """Give every worker its own connections, caches and thread pools.
+
+    This runs once the worker is initialized, after the gevent worker has
+    patched itself, so that nothing here is created before patching.
+    """
+
+    from app import init_process_state
+    from models import db
+
+    app = worker.app.wsgi()
+
+    # Connections opened by the master must not be shared between processes
+    with app.app_context():
+        db.engine.dispose()
+
+    init_process_state(app)
+
+
+def worker_exit(server, worker):
+    """Let queued slash commands post their replies before exiting."""
+
+    app = server.app.wsgi()
+    app.events.stop()
+    app.command_runner.shutdown(wait=True)
@@ -1,10 +1,35 @@
 """SQLAlchemy models for Dolt."""
 
-from datetime import date, datetime
+from collections import namedtuple
+from datetime import date, datetime, timedelta
 
-from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy import SQLAlchemy, SignallingSession, get_state
+from sqlalchemy import orm
 
-db = SQLAlchemy()
+from pool import engine_options, set_transaction_timeout
+
+
+class RoutingSession(SignallingSession):
+    """ Session that reads from the replica when asked to
+
+    Setting info['replica'] sends the queries of the session to the replica
+    bind, except for flushes, which always go to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None):
+        if self.info.get('replica') and not self._flushing:
+            state = get_state(self.app)
+            return state.db.get_engine(self.app, bind='replica')
+
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+
+db = RoutingSQLAlchemy()
 
 
 class User(db.Model):
@@ -29,7 +54,8 @@ class User(db.Model):
 
     slack_user_id = db.Column(
         db.Text,
-        nullable=False
+        nullable=False,
+        unique=True
     )
 
     slack_team_id = db.Column(
@@ -42,9 +68,57 @@ class User(db.Model):
         nullable=False
     )
 
+    # Bumped by every change to the tasks or groups of the user, so that
+    # pages and caches derived from them can be checked for staleness
+    data_version = db.Column(
+        db.BigInteger,
+        default=0,
+        server_default='0',
+        nullable=False
+    )
+
     def get_firstname(self):
         return name.partition(' ')[0]
 
+    @classmethod
+    def get_data_version(cls, user_id):
+        """ Return the current data version of a user """
+
+        return (db.session
+                .query(cls.data_version)
+                .filter(cls.id == user_id)
+                .scalar())
+
+    @classmethod
+    def bump_data_version(cls, user_id):
+        """ Increment the data version of a user in the current transaction """
+
+        table = cls.__table__
+        db.session.execute(
+            table.update()
+            .where(table.c.id == user_id)
+            .values(data_version=table.c.data_version + 1))
+
+
+class UserRow(namedtuple('UserRow', ['id', 'name', 'email', 'slack_user_id',
+                                     'slack_team_id', 'slack_img_url'])):
+    """ Read-only copy of a user that can be cached between requests """
+
+    __slots__ = ()
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.name, user.email, user.slack_user_id,
+                   user.slack_team_id, user.slack_img_url)
+
+
+class TaskRow(namedtuple('TaskRow', ['id', 'title', 'due', 'important',
+                                     'completed', 'has_description',
+                                     'created_at', 'group_name'])):
+    """ Read-only task with only the columns that task lists show """
+
+    __slots__ = ()
+
 
 class Task(db.Model):
     """ Tasks are to-do items """
@@ -67,7 +141,7 @@ class Task(db.Model):
 
     due = db.Column(
         db.Date,
-        default=date.today().isoformat()
+        default=date.today
     )
 
     important = db.Column(
@@ -84,7 +158,7 @@ class Task(db.Model):
 
     created_at = db.Column(
         db.DateTime,
-        default=datetime.now(),
+        default=datetime.now,
         nullable=False
     )
 
@@ -102,6 +176,254 @@ class Task(db.Model):
     user = db.relationship('User', backref='tasks')
     group = db.relationship('Group', backref='tasks')
 
+    # Sorting options for the task lists, the first one is the default
+    SORTS = ('recent', 'alphabetical', 'due')
+
+    # Views that Slack commands can filter tasks by with $due
+    DUE_FILTERS = ('today', 'tomorrow', 'later')
+
+    @classmethod
+    def view_criteria(cls, view):
+        """ Return the filters for a quick view name or a group id """
+
+        today = date.today()
+
+        if view == 'all':
+            return [~cls.completed]
+        if view == 'important':
+            return [cls.important, ~cls.completed]
+        if view == 'completed':
+            return [cls.completed]
+        if view == 'today':
+            return [cls.due <= today, ~cls.completed]
+        # Compare the column itself to a date, so that the due index is used
+        if view == 'tomorrow':
+            return [cls.due == today + timedelta(days=1), ~cls.completed]
+        if view == 'later':
+            return [cls.due >= today + timedelta(days=2), ~cls.completed]
+
+        # Any other view is the id of a group
+        return [cls.group_id == view, ~cls.completed]
+
+    @classmethod
+    def sort_order(cls, sort):
+        """ Return the ORDER BY clauses for a sorting option """
+
+        # The id breaks ties so that the order is always deterministic
+        if sort == 'alphabetical':
+            return [cls.title, cls.id]
+        if sort == 'due':
+            return [cls.due, cls.id]
+
+        return [cls.created_at.desc(), cls.id.desc()]
+
+    @classmethod
+    def sort_key(cls, sort, task):
+        """ Return the values that place a task in a sort """
+
+        if sort == 'alphabetical':
+            return (task.title, task.id)
+        if sort == 'due':
+            return (task.due, task.id)
+
+        return (task.created_at, task.id)
+
+    @classmethod
+    def after_key(cls, sort, key):
+        """ Filter the tasks that come after a sort key (keyset paging) """
+
+        value, id = key
+
+        if sort == 'alphabetical':
+            return db.tuple_(cls.title, cls.id) > db.tuple_(value, id)
+        if sort == 'due':
+            # Tasks without a due date are sorted last
+            if value is None:
+                return db.and_(cls.due.is_(None), cls.id > id)
+            return db.or_(db.tuple_(cls.due, cls.id) > db.tuple_(value, id),
+                          cls.due.is_(None))
+
+        return db.tuple_(cls.created_at, cls.id) < db.tuple_(value, id)
+
+    @classmethod
+    def due_buckets(cls, user_id):
+        """ Count and list the open tasks of a user by when they are due
+
+        All buckets are computed in one pass over the due index.
+        """
+
+        today = date.today()
+        buckets = {
+            'overdue': cls.due < today,
+            'today': cls.due == today,
+            'tomorrow': cls.due == today + timedelta(days=1),
+            'later': cls.due >= today + timedelta(days=2),
+        }
+
+        columns = []
+        for criterion in buckets.values():
+            columns.append(db.func.count().filter(criterion))
+            columns.append(db.func.array_agg(cls.id).filter(criterion))
+
+        row = (db.session
+               .query(*columns)
+               .filter(cls.user_id == user_id, ~cls.completed)
+               .one())
+
+        return {
+            name: {'count': row[2 * i], 'ids': sorted(row[2 * i + 1] or [])}
+            for i, name in enumerate(buckets)
+        }
+
+    @classmethod
+    def view_counts(cls, user_id):
+        """ Count the tasks of a user in every quick view and group
+
+        Uses a single GROUP BY over the tasks of the user, with a FILTER
+        clause for each quick view.
+        """
+
+        views = ['all', 'important', 'completed', 'today', 'tomorrow', 'later']
+        columns = [db.func.count().filter(db.and_(*cls.view_criteria(view)))
+                   for view in views]
+
+        rows = (db.session
+                .query(cls.group_id, *columns)
+                .filter(cls.user_id == user_id)
+                .group_by(cls.group_id)
+                .all())
+
+        counts = dict.fromkeys(views, 0)
+        counts['groups'] = {}
+        for group_id, *view_counts in rows:
+            for view, count in zip(views, view_counts):
+                counts[view] += count
+
+            # Groups list their open tasks like the all view
+            if group_id is not None:
+                counts['groups'][group_id] = view_counts[0]
+
+        return counts
+
+    @classmethod
+    def filter_criteria(cls, due=None, group_name=None, important=False,
+                        match_all=False):
+        """ Combine the filters of a Slack command into one criterion
+
+        A task matches if it matches any of the given filters, or all of
+        them with match_all, or if no filters are given. Tasks in a group
+        are matched with an EXISTS, so the criterion also works in an UPDATE
+        or DELETE.
+        """
+
+        criteria = []
+        if due in cls.DUE_FILTERS:
+            criteria.append(db.and_(*cls.view_criteria(due)))
+        if group_name is not None:
+            criteria.append(cls.group.has(Group.name == group_name))
+        if important:
+            criteria.append(cls.important)
+
+        if not criteria:
+            return db.true()
+        if match_all:
+            return db.and_(*criteria)
+        return db.or_(*criteria)
+
+    @classmethod
+    def create_many(cls, user_id, tasks):
+        """ Add tasks for a user with one multi-row INSERT
+
+        Each task is a dict with a title and optionally a description, due,
+        important and group_name. Returns the ids of the new tasks in the
+        same order.
+        """
+
+        # An INSERT needs at least one row
+        if not tasks:
+            return []
+
+        now = datetime.now()
+        rows = []
+        for task in tasks:
+            group_name = task.get('group_name')
+            group_id = None
+            if group_name and group_name != 'None':
+                group_id = Group.id_by_name(user_id, group_name)
+
+            rows.append(dict(
+                title=task['title'],
+                description=task.get('description'),
+                due=task.get('due') or date.today(),
+                important=bool(task.get('important')),
+                completed=False,
+                created_at=now,
+                user_id=user_id,
+                group_id=group_id))
+
+        table = cls.__table__
+        result = db.session.execute(
+            table.insert().values(rows).returning(table.c.id))
+
+        return [row.id for row in result]
+
+    @classmethod
+    def batch(cls, user_id, criterion, op, group_name=None, due=None):
+        """ Apply an operation to the tasks of a user matching a criterion
+
+        The operation runs as a single UPDATE or DELETE. Returns the ids of
+        the tasks that were changed. Raises ValueError for unknown operations.
+        """
+
+        table = cls.__table__
+        where = db.and_(table.c.user_id == user_id, criterion)
+
+        if op == 'delete':
+            statement = table.delete().where(where)
+        else:
+            if op == 'complete':
+                values = dict(completed=True)
+            elif op == 'uncomplete':
+                values = dict(completed=False)
+            elif op == 'star':
+                values = dict(important=True)
+            elif op == 'unstar':
+                values = dict(important=False)
+            elif op == 'group':
+                group_id = None
+                if group_name and group_name != 'None':
+                    group_id = Group.id_by_name(user_id, group_name)
+                values = dict(group_id=group_id)
+            elif op == 'due':
+                values = dict(due=due or None)
+            else:
+                raise ValueError(f"Unknown batch operation: {op}")
+
+            statement = table.update().where(where).values(**values)
+
+        rows = db.session.execute(statement.returning(table.c.id))
+        return [row.id for row in rows]
+
+    @classmethod
+    def rows_for_view(cls, user_id, view, sort='recent'):
+        """ Query the columns of TaskRow for the tasks shown in a view
+
+        This skips building ORM instances for lists that are only displayed.
+        """
+
+        return (db.session
+                .query(cls.id,
+                       cls.title,
+                       cls.due,
+                       cls.important,
+                       cls.completed,
+                       db.func.coalesce(cls.description, '') != '',
+                       cls.created_at,
+                       Group.name)
+                .outerjoin(Group, cls.group_id == Group.id)
+                .filter(cls.user_id == user_id, *cls.view_criteria(view))
+                .order_by(*cls.sort_order(sort)))
+
 
 class Group(db.Model):
     """ Group of tasks used for sorting """
@@ -126,10 +448,152 @@ class Group(db.Model):
 
     user = db.relationship('User', backref='groups')
 
+    @classmethod
+    def id_by_name(cls, user_id, name):
+        """ Select the id of a group of a user by name, as a subquery """
+
+        return (db.select([cls.id])
+                .where(db.and_(cls.user_id == user_id, cls.name == name))
+                .limit(1)
+                .as_scalar())
+
+    @classmethod
+    def for_user(cls, user_id):
+        """ Query the groups of a user in the order they were added """
+
+        return cls.query.filter_by(user_id=user_id).order_by(cls.id)
+
+
+class SlackInstallation(db.Model):
+    """ Installations of the Slack app, one row per install by a user """
+
+    __tablename__ = 'slack_installations'
+
+    id = db.Column(
+        db.Integer,
+        primary_key=True,
+    )
+
+    app_id = db.Column(db.String)
+    enterprise_id = db.Column(db.String)
+    team_id = db.Column(db.String)
+    user_id = db.Column(db.String)
+    bot_token = db.Column(db.String)
+    bot_id = db.Column(db.String)
+    bot_user_id = db.Column(db.String)
+    bot_scopes = db.Column(db.String)
+    user_token = db.Column(db.String)
+    user_scopes = db.Column(db.String)
+    incoming_webhook_url = db.Column(db.String)
+    incoming_webhook_channel_id = db.Column(db.String)
+    incoming_webhook_configuration_url = db.Column(db.String)
+
+    installed_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        default=datetime.now
+    )
+
+
+class SlackOAuthState(db.Model):
+    """ OAuth state values issued for logins and installs """
+
+    __tablename__ = 'slack_oauth_states'
+
+    state = db.Column(
+        db.String,
+        primary_key=True,
+    )
+
+    expire_at = db.Column(
+        db.DateTime,
+        nullable=False
+    )
+
+
+# Indexes for the task views. Every view filters on the user first, and all
+# views except the completed one only look at open tasks, which is why most of
+# them are partial indexes on open tasks. The open and completed lists are
+# read straight from the index matching the sorting option.
+db.Index('ix_tasks_user_completed_created',
+         Task.user_id, Task.completed, Task.created_at, Task.id)
+db.Index('ix_tasks_user_completed_title',
+         Task.user_id, Task.completed, Task.title, Task.id)
+db.Index('ix_tasks_user_completed_due',
+         Task.user_id, Task.completed, Task.due, Task.id)
+db.Index('ix_tasks_user_group_open',
+         Task.user_id, Task.group_id,
+         postgresql_where=~Task.completed)
+db.Index('ix_tasks_user_important_open',
+         Task.user_id,
+         postgresql_where=db.and_(Task.important, ~Task.completed))
+db.Index('ix_tasks_group_id', Task.group_id)
+db.Index('ix_groups_user_id', Group.user_id)
+
+# Installations are looked up by team or enterprise and optionally by user,
+# latest first. Expired states are swept by their expiry.
+db.Index('ix_slack_installations_lookup',
+         SlackInstallation.enterprise_id, SlackInstallation.team_id,
+         SlackInstallation.user_id, SlackInstallation.installed_at)
+db.Index('ix_slack_oauth_states_expire_at', SlackOAuthState.expire_at)
+
+
+def update_owned(model, id, user_id, **values):
+    """Update a row owned by a user in one statement and return the new row.
+
+    Ownership is checked in the WHERE clause of the UPDATE, and the new
+    values come back through RETURNING, so no SELECT is needed first and
+    concurrent updates like toggles can't overwrite each other. Returns
+    None if the user owns no row with that id.
+    """
+
+    table = model.__table__
+
+    return db.session.execute(
+        table.update()
+        .where(db.and_(table.c.id == id, table.c.user_id == user_id))
+        .values(**values)
+        .returning(*table.c)).first()
+
+
+def delete_owned(model, id, user_id):
+    """Delete a row owned by a user in one statement.
+
+    Ownership is checked in the WHERE clause of the DELETE, like in
+    update_owned. Returns the id of the deleted row, or None if the user
+    owns no row with that id.
+    """
+
+    table = model.__table__
+
+    return db.session.execute(
+        table.delete()
+        .where(db.and_(table.c.id == id, table.c.user_id == user_id))
+        .returning(table.c.id)).scalar()
+
 
 def connect_db(app):
     """Connect this database to provided Flask app.
     """
 
+    app.config.setdefault(
+        'SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+
+    if app.config['REPLICA_DATABASE_URL']:
+        app.config.setdefault('SQLALCHEMY_BINDS', {})
+        app.config['SQLALCHEMY_BINDS']['replica'] = (
+            app.config['REPLICA_DATABASE_URL'])
+
     db.app = app
     db.init_app(app)
+
+    # Replica reads need the timeout as much as the primary
+    if app.config['DB_PGBOUNCER'] and app.config['DB_STATEMENT_TIMEOUT']:
+        with app.app_context():
+            engines = [db.engine]
+            if app.config['REPLICA_DATABASE_URL']:
+                engines.append(db.get_engine(app, bind='replica'))
+
+            for engine in engines:
+                set_transaction_timeout(
+                    engine, app.config['DB_STATEMENT_TIMEOUT'])
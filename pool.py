@@ -0,0 +1,110 @@
+"""Database engine options and an instrumented connection pool for Dolt."""
+
+from threading import Lock
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import NullPool, QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """ Queue pool that records how long checkouts wait for a connection
+
+    A pool that is too small shows up as checkouts waiting, and as the
+    share of its capacity in use approaching 1.
+    """
+
+    def __init__(self, creator, **kw):
+        super().__init__(creator, **kw)
+        self._stats_lock = Lock()
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._peak_checked_out = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            with self._stats_lock:
+                self._timeouts += 1
+            raise
+
+        wait = time.perf_counter() - start
+        checked_out = self.checkedout()
+        with self._stats_lock:
+            self._checkouts += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._peak_checked_out = max(self._peak_checked_out, checked_out)
+
+        return conn
+
+    def capacity(self):
+        """ Return the most connections the pool will open at once """
+
+        return self.size() + max(self._max_overflow, 0)
+
+    def stats(self):
+        """ Return the checkout waits and saturation of the pool """
+
+        capacity = self.capacity()
+        with self._stats_lock:
+            return dict(
+                size=self.size(),
+                capacity=capacity,
+                checked_out=self.checkedout(),
+                saturation=self.checkedout() / capacity,
+                peak_saturation=self._peak_checked_out / capacity,
+                checkouts=self._checkouts,
+                timeouts=self._timeouts,
+                mean_wait_ms=(self._wait_total / self._checkouts * 1000
+                              if self._checkouts else None),
+                max_wait_ms=self._wait_max * 1000)
+
+
+def engine_options(config):
+    """Return the SQLAlchemy engine options for the DB_* settings.
+
+    In PgBouncer mode connections are not pooled here, since PgBouncer pools
+    them, and the statement timeout is set per transaction, since server
+    connections are shared between clients in transaction pooling.
+    """
+
+    timeout = config['DB_STATEMENT_TIMEOUT']
+
+    if config['DB_PGBOUNCER']:
+        options = dict(poolclass=NullPool)
+    else:
+        options = dict(
+            poolclass=InstrumentedQueuePool,
+            pool_size=config['DB_POOL_SIZE'],
+            max_overflow=config['DB_MAX_OVERFLOW'],
+            pool_timeout=config['DB_POOL_TIMEOUT'],
+            pool_recycle=config['DB_POOL_RECYCLE'],
+            pool_pre_ping=config['DB_POOL_PRE_PING'])
+        if timeout:
+            options['connect_args'] = dict(
+                options=f'-c statement_timeout={timeout}')
+
+    return options
+
+
+def set_transaction_timeout(engine, timeout):
+    """Set statement_timeout at the start of every transaction of engine."""
+
+    @event.listens_for(engine, 'begin')
+    def begin(conn):
+        conn.execute(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+
+def pool_stats(engine):
+    """Return the stats of the pool of engine, if it keeps any."""
+
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        return pool.stats()
+
+    return dict(pool=type(pool).__name__)
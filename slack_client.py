@@ -0,0 +1,193 @@
+"""Shared HTTP client for the Slack Web API and response URLs."""
+
+from threading import Lock
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limited or Slack having trouble
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class SlackClientError(Exception):
+    """ Slack could not be reached or kept failing """
+
+
+class CircuitOpenError(SlackClientError):
+    """ Slack failed too often recently, so calls fail without trying """
+
+
+class CircuitBreaker:
+    """ Fail fast after repeated failures, until reset_timeout has passed
+
+    After failure_threshold consecutive failures the circuit opens and every
+    call is refused. Once reset_timeout seconds have passed, a single call is
+    let through: its success closes the circuit, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = Lock()
+
+    def allow(self):
+        """ Return whether a call may be made now """
+
+        with self._lock:
+            if self._opened_at is None:
+                return True
+
+            if (not self._trial and time.monotonic()
+                    >= self._opened_at + self.reset_timeout):
+                self._trial = True
+                return True
+
+            return False
+
+    def succeeded(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failed(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                self._trial = False
+
+
+class SlackClient:
+    """ Call the Slack Web API through a pooled keep-alive session
+
+    Every call has a connect and read timeout. Rate limited and failed calls
+    are retried up to max_retries times, waiting as long as Retry-After asks.
+    Calls Slack asks to wait longer than max_retry_wait seconds for are not
+    retried, and neither are calls that time out while reading, since Slack
+    may have handled them already.
+    """
+
+    def __init__(self, base_url='https://slack.com/api/', timeout=(3, 5),
+                 max_retries=2, max_retry_wait=5, pool_size=10,
+                 breaker=None):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_retry_wait = max_retry_wait
+        self.breaker = breaker or CircuitBreaker()
+
+        self._http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self._http.mount('https://', adapter)
+        self._http.mount('http://', adapter)
+
+    def api_call(self, method, token=None, data=None):
+        """ Call a Web API method and return the decoded response
+
+        Slack reports errors of the call itself with ok set to false, which
+        is left for the caller to check.
+        """
+
+        headers = {}
+        if token is not None:
+            headers['Authorization'] = f'Bearer {token}'
+
+        response = self._request(self.base_url + method,
+                                 data=data or {}, headers=headers)
+        try:
+            return response.json()
+        except ValueError as e:
+            raise SlackClientError(f'{method} returned no JSON') from e
+
+    def oauth_v2_access(self, client_id, client_secret, code, redirect_uri):
+        return self.api_call('oauth.v2.access', data=dict(
+            client_id=client_id,
+            client_secret=client_secret,
+            code=code,
+            redirect_uri=redirect_uri))
+
+    def users_identity(self, token):
+        return self.api_call('users.identity', token=token)
+
+    def auth_test(self, token):
+        return self.api_call('auth.test', token=token)
+
+    def post_response(self, response_url, message):
+        """ Post a message to the response_url of a slash command """
+
+        self._request(response_url, json=message)
+
+    def _request(self, url, **kwargs):
+        """ POST to url with retries, through the circuit breaker """
+
+        if not self.breaker.allow():
+            raise CircuitOpenError('Slack is failing, not calling it for now')
+
+        try:
+            response = self._post_with_retries(url, **kwargs)
+        except requests.RequestException as e:
+            self.breaker.failed()
+            raise SlackClientError(f'{url} could not be reached') from e
+
+        if response.status_code in RETRY_STATUSES:
+            self.breaker.failed()
+        else:
+            # Slack is up even if it refused this request
+            self.breaker.succeeded()
+
+        if not response.ok:
+            raise SlackClientError(f'{url} answered {response.status_code}')
+
+        return response
+
+    def _post_with_retries(self, url, **kwargs):
+        """ POST to url, retrying failed connections and retryable answers """
+
+        for attempt in range(self.max_retries + 1):
+            last = attempt == self.max_retries
+            try:
+                response = self._http.post(url, timeout=self.timeout,
+                                           **kwargs)
+            except requests.ReadTimeout:
+                raise
+            except requests.ConnectionError:
+                if last:
+                    raise
+                time.sleep(self._retry_wait(None, attempt))
+                continue
+
+            if response.status_code not in RETRY_STATUSES or last:
+                return response
+
+            wait = self._retry_wait(response, attempt)
+            if wait is None:
+                return response
+            time.sleep(wait)
+
+    def _retry_wait(self, response, attempt):
+        """ Return the seconds to wait before retrying
+
+        Returns None if Slack asks to wait longer than max_retry_wait, since
+        retrying any sooner would only be refused again.
+        """
+
+        wait = 0.5 * 2 ** attempt
+        if response is not None and 'Retry-After' in response.headers:
+            try:
+                retry_after = float(response.headers['Retry-After'])
+            except ValueError:
+                pass
+            else:
+                if retry_after > self.max_retry_wait:
+                    return None
+                return retry_after
+
+        return min(wait, self.max_retry_wait)
+
+    def close(self):
+        self._http.close()
@@ -0,0 +1,74 @@
+"""Background runner for Slack slash commands."""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore
+import logging
+
+from slack_client import SlackClientError
+
+logger = logging.getLogger(__name__)
+
+FAILED_REPLY = {
+    "response_type": "ephemeral",
+    "blocks": [
+        {
+            "type": "section",
+            "text": {
+                "type": "mrkdwn",
+                "text": "Sorry, something went wrong :worried: Please check your parameters and try again!"
+            }
+        }
+    ]
+}
+
+
+class CommandRunner:
+    """ Build replies to slash commands in a bounded thread pool
+
+    Each reply is posted to the response_url of its command through the
+    shared Slack client. At most max_workers commands run at once and at most
+    max_pending more wait for a worker; further commands are rejected
+    instead of queueing up without bound.
+    """
+
+    def __init__(self, app, slack, max_workers=4, max_pending=32):
+        self.app = app
+        self.slack = slack
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='slack-command')
+        self._slots = BoundedSemaphore(max_workers + max_pending)
+
+    def submit(self, command, form):
+        """ Queue a command, returning False if the runner is full """
+
+        if not self._slots.acquire(blocking=False):
+            return False
+
+        try:
+            future = self._executor.submit(self._run, command, form)
+        except RuntimeError:
+            self._slots.release()
+            return False
+
+        future.add_done_callback(lambda future: self._slots.release())
+        return True
+
+    def _run(self, command, form):
+        """ Build the reply in an app context and post it to Slack """
+
+        with self.app.app_context():
+            try:
+                reply = command(form)
+            except Exception:
+                logger.exception("Slash command %s failed",
+                                 form.get('command'))
+                reply = FAILED_REPLY
+
+        try:
+            self.slack.post_response(form['response_url'], reply)
+        except SlackClientError:
+            logger.exception("Posting the reply to %s failed",
+                             form.get('command'))
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
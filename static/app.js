@@ -20,7 +20,7 @@ async function addNewTask(e) {
   const group = $("#new-task-group").val();
 
   // Send the new task to backend API
-  await axios.post("/api/tasks/new", {
+  const res = await axios.post("/api/tasks/new", {
     title,
     description,
     date,
@@ -33,7 +33,7 @@ async function addNewTask(e) {
   $("#datepicker").val("");
   $("#new-task-group").val("");
 
-  location.reload();
+  await showTasks(res.data.ids, true);
 }
 
 /* Handle submission of the add group form */
@@ -43,12 +43,21 @@ async function addNewGroup(e) {
   const name = $("#new-group-name").val();
 
   // Send the new group to backend API
-  await axios.post("/api/groups/new", { name });
+  const res = await axios.post("/api/groups/new", { name });
 
   // Resetting of form values on submit
   $("#new-group-name").val("");
+  $("#new-group-modal").modal("hide");
 
-  location.reload();
+  addGroupOption(res.data.id, res.data.name);
+  refreshSidebar();
+}
+
+/* Let new and selected tasks be put in a new group */
+function addGroupOption(id, name) {
+  for (const select of [$("#new-task-group"), $("#batch-group")]) {
+    select.append($("<option>").attr("data-group", id).text(name));
+  }
 }
 
 /* Hide all of the new task fields */
@@ -63,15 +72,32 @@ function showNewTaskFields() {
   newTaskFields.show();
 }
 
+/* Remove a task card that no longer belongs in the current view */
+function removeTaskCard(card) {
+  card.find('[data-toggle="tooltip"]').tooltip("hide");
+  card.fadeOut(200, function () {
+    card.remove();
+  });
+}
+
 /* Star task and send to API */
 async function starTask(e) {
+  // Clicks select the whole task while selecting tasks
+  if (selecting) return;
+
   e.preventDefault();
 
-  id = e.currentTarget.attributes[1].value;
+  const id = $(e.currentTarget).data("star");
+  const card = $(e.currentTarget).closest(".task");
 
-  await axios.post("/api/tasks/important", { id });
+  const res = await axios.post("/api/tasks/important", { id });
 
-  location.reload();
+  // Update the card in place instead of reloading the page
+  if (!res.data.important && location.pathname === "/tasks/important") {
+    removeTaskCard(card);
+  } else {
+    card.toggleClass("important", res.data.important);
+  }
 }
 
 /* Sort tasks in API and refresh */
@@ -85,17 +111,218 @@ async function sortTasks(e) {
   location.reload();
 }
 
-/* Complete tasks in API and refresh */
+/* Complete tasks in API and remove them from the list */
 async function completeTasks(e) {
-  e.preventDefault();
+  // Clicks select the whole task while selecting tasks
+  if (selecting) return;
 
-  console.log(e);
+  e.preventDefault();
 
-  id = e.currentTarget.attributes[1].value;
+  const id = $(e.currentTarget).data("completed");
+  const card = $(e.currentTarget).closest(".task");
 
   await axios.post("/api/tasks/completed", { id });
 
-  location.reload();
+  // Each view only lists either open or completed tasks
+  removeTaskCard(card);
+}
+
+/* Selecting tasks to change many of them at once */
+let selecting = false;
+
+function updateBatchCount() {
+  $("#batch-count").text(`${$(".task.selected").length} selected`);
+}
+
+/* Switch between opening tasks and selecting them on click */
+function toggleSelecting(e) {
+  e.preventDefault();
+
+  selecting = !selecting;
+  $("#batch-toolbar").toggle(selecting);
+  $("#select-tasks").text(selecting ? "Done" : "Select");
+  $(".task.selected").removeClass("selected");
+  updateBatchCount();
+}
+
+/* Select or unselect a task instead of opening it */
+function selectTask(e) {
+  if (!selecting) return;
+
+  e.preventDefault();
+  $(e.currentTarget).toggleClass("selected");
+  updateBatchCount();
+}
+
+/* Send an operation for all selected tasks to the batch API */
+async function batchTasks(e) {
+  const op = $(e.currentTarget).data("batch");
+  const cards = $(".task.selected");
+  const ids = cards.map((i, card) => $(card).data("task")).get();
+
+  if (ids.length === 0) return;
+
+  const res = await axios.post("/api/tasks/batch", {
+    op,
+    ids,
+    group: $("#batch-group").val(),
+  });
+
+  // Moving tasks changes where and how they are listed
+  if (op === "group") {
+    await showTasks(res.data.ids);
+    return;
+  }
+
+  for (const id of res.data.ids) {
+    const card = cards.filter(`[data-task="${id}"]`);
+    card.removeClass("selected");
+
+    if (op === "star" || op === "unstar") {
+      card.toggleClass("important", op === "star");
+      if (op === "unstar" && location.pathname === "/tasks/important") {
+        removeTaskCard(card);
+      }
+    } else if (
+      op === "delete" ||
+      (op === "complete") !== (location.pathname === "/tasks/completed")
+    ) {
+      // The completed view only lists completed tasks and the others only
+      // list open tasks
+      removeTaskCard(card);
+    }
+  }
+
+  updateBatchCount();
+}
+
+/* Append the next page of tasks to the list */
+async function loadMoreTasks(loadMore) {
+  const cursor = loadMore.data("cursor");
+
+  // Only load each page once
+  loadMore.removeAttr("data-cursor").removeData("cursor");
+
+  const res = await axios.get(location.pathname, { params: { cursor } });
+  const page = $(res.data);
+
+  loadMore.replaceWith(page);
+  page.find('[data-toggle="tooltip"]').tooltip();
+
+  observeLoadMore();
+}
+
+/* Watch for the end of the task list to be scrolled into view */
+const loadMoreObserver = new IntersectionObserver(function (entries) {
+  for (const entry of entries) {
+    if (entry.isIntersecting) {
+      loadMoreObserver.unobserve(entry.target);
+      loadMoreTasks($(entry.target));
+    }
+  }
+});
+
+function observeLoadMore() {
+  $(".load-more[data-cursor]").each(function () {
+    loadMoreObserver.observe(this);
+  });
+}
+
+/* The view listed on this page, as a quick view name or a group id */
+function currentView() {
+  return $("#task-list").data("view");
+}
+
+/* Fetch the cards of changed tasks and patch them into the list
+ *
+ * Cards of tasks that no longer belong in the view are removed. Tasks that
+ * are not listed yet are only added if they were just created, at the top
+ * of the list, since other tasks may just be on a page not loaded yet.
+ */
+async function showTasks(ids, created = false) {
+  const taskList = $("#task-list");
+  if (!taskList.length) return;
+
+  const res = await axios.get("/api/tasks/cards", {
+    params: { view: currentView(), ids: ids.join(",") },
+  });
+  const cards = $(res.data).filter(".task");
+
+  for (const id of ids) {
+    const card = cards.filter(`[data-task="${id}"]`);
+    const listed = taskList.children(`[data-task="${id}"]`);
+
+    if (listed.length && card.length) {
+      card.toggleClass("selected", listed.hasClass("selected"));
+      listed.find('[data-toggle="tooltip"]').tooltip("hide");
+      listed.replaceWith(card);
+    } else if (listed.length) {
+      removeTaskCard(listed);
+    } else if (card.length && created) {
+      taskList.prepend(card);
+    }
+  }
+
+  cards.find('[data-toggle="tooltip"]').tooltip();
+  if (taskList.children(".task").length) $("#no-tasks").remove();
+
+  updateBatchCount();
+  refreshSidebar();
+}
+
+/* Refresh the groups and task counts of the sidebar, once per burst of
+ * changes */
+let sidebarTimer = null;
+
+function refreshSidebar() {
+  clearTimeout(sidebarTimer);
+  sidebarTimer = setTimeout(async function () {
+    const res = await axios.get("/api/sidebar", {
+      params: { view: currentView() },
+    });
+    $("#sidebar").html(res.data);
+  }, 250);
+}
+
+/* Patch the page with changes made in other tabs or through Slack */
+function listenForChanges() {
+  if (!window.EventSource || !$("#task-list").length) return;
+
+  const events = new EventSource("/api/events");
+
+  function patchTasks(e) {
+    showTasks(JSON.parse(e.data).ids, e.type === "task.created");
+  }
+
+  events.addEventListener("task.created", patchTasks);
+  events.addEventListener("task.updated", patchTasks);
+  events.addEventListener("task.completed", patchTasks);
+
+  events.addEventListener("task.deleted", function (e) {
+    for (const id of JSON.parse(e.data).ids) {
+      const card = $(`#task-list > [data-task="${id}"]`);
+      if (card.length) removeTaskCard(card);
+    }
+    refreshSidebar();
+  });
+
+  // Groups created in this tab already have their options
+  events.addEventListener("group.created", function (e) {
+    const id = JSON.parse(e.data).ids[0];
+    if ($(`#new-task-group option[data-group="${id}"]`).length) {
+      refreshSidebar();
+    } else {
+      location.reload();
+    }
+  });
+
+  // Renamed and deleted groups show up all over the page, and reload is
+  // sent when events were missed
+  for (const type of ["group.updated", "group.deleted", "reload"]) {
+    events.addEventListener(type, function () {
+      location.reload();
+    });
+  }
 }
 
 /* Collection of all the event listeners */
@@ -105,9 +332,8 @@ function addEventListeners() {
   const cancelBtn = $("#cancel-btn");
   const addGroupModal = $("#new-group-modal");
   const addGroupForm = $("#add-group-form");
-  const star = $("[data-star]");
+  const taskList = $("#task-list");
   const sort = $(".sort");
-  const check = $(".check");
 
   // Submit event for new tasks
   newTaskForm.on("submit", addNewTask);
@@ -124,14 +350,25 @@ function addEventListeners() {
   // Submit event for new groups
   addGroupForm.on("submit", addNewGroup);
 
-  // Change importance for the task
-  star.on("click", starTask);
+  // Change importance for the task, also for tasks loaded while scrolling
+  taskList.on("click", "[data-star]", starTask);
 
   // Sort tasks based on backend API
   sort.on("click", sortTasks);
 
   // Complete tasks by checking them
-  check.on("click", completeTasks);
+  taskList.on("click", ".check", completeTasks);
+
+  // Select tasks and change them all at once
+  $("#select-tasks").on("click", toggleSelecting);
+  taskList.on("click", ".task", selectTask);
+  $("[data-batch]").on("click", batchTasks);
+
+  // Load more tasks when scrolling to the end of the list
+  observeLoadMore();
+
+  // Show changes as they happen instead of after reloading
+  listenForChanges();
 }
 
 addEventListeners();
@@ -0,0 +1,171 @@
+"""Slack installation and OAuth state stores backed by the Dolt database."""
+
+from datetime import datetime, timedelta
+from logging import Logger
+from uuid import uuid4
+import logging
+
+from slack_sdk.oauth.installation_store import (
+    Bot, Installation, InstallationStore)
+from slack_sdk.oauth.state_store import OAuthStateStore
+
+from models import db, SlackInstallation, SlackOAuthState
+
+
+class SQLInstallationStore(InstallationStore):
+    """ Keep Slack installations in the slack_installations table
+
+    Every install adds a row, and lookups return the latest one, so that the
+    history of installations is kept like in the file store.
+    """
+
+    def __init__(self, logger=logging.getLogger(__name__)):
+        self._logger = logger
+
+    @property
+    def logger(self) -> Logger:
+        return self._logger
+
+    def save(self, installation):
+        """ Store an installation """
+
+        db.session.add(SlackInstallation(
+            app_id=installation.app_id,
+            enterprise_id=installation.enterprise_id,
+            team_id=installation.team_id,
+            user_id=installation.user_id,
+            bot_token=installation.bot_token,
+            bot_id=installation.bot_id,
+            bot_user_id=installation.bot_user_id,
+            bot_scopes=','.join(installation.bot_scopes or []) or None,
+            user_token=installation.user_token,
+            user_scopes=','.join(installation.user_scopes or []) or None,
+            incoming_webhook_url=installation.incoming_webhook_url,
+            incoming_webhook_channel_id=(
+                installation.incoming_webhook_channel_id),
+            incoming_webhook_configuration_url=(
+                installation.incoming_webhook_configuration_url)))
+        db.session.commit()
+
+    def find_installation(self, *, enterprise_id, team_id, user_id=None,
+                          is_enterprise_install=False):
+        """ Return the latest installation in a workspace, or None
+
+        If user_id is given, only installations by that user are considered.
+        """
+
+        row = self._latest(enterprise_id, team_id, is_enterprise_install,
+                           user_id=user_id)
+        if row is None:
+            return None
+
+        return Installation(
+            app_id=row.app_id,
+            enterprise_id=row.enterprise_id,
+            team_id=row.team_id,
+            user_id=row.user_id,
+            bot_token=row.bot_token,
+            bot_id=row.bot_id,
+            bot_user_id=row.bot_user_id,
+            bot_scopes=row.bot_scopes,
+            user_token=row.user_token,
+            user_scopes=row.user_scopes,
+            incoming_webhook_url=row.incoming_webhook_url,
+            incoming_webhook_channel_id=row.incoming_webhook_channel_id,
+            incoming_webhook_configuration_url=(
+                row.incoming_webhook_configuration_url),
+            installed_at=row.installed_at.timestamp())
+
+    def find_bot(self, *, enterprise_id, team_id,
+                 is_enterprise_install=False):
+        """ Return the bot of the latest installation with one, or None """
+
+        row = self._latest(enterprise_id, team_id, is_enterprise_install,
+                           bot=True)
+        if row is None:
+            return None
+
+        return Bot(
+            app_id=row.app_id,
+            enterprise_id=row.enterprise_id,
+            team_id=row.team_id,
+            bot_token=row.bot_token,
+            bot_id=row.bot_id,
+            bot_user_id=row.bot_user_id,
+            bot_scopes=row.bot_scopes,
+            installed_at=row.installed_at.timestamp())
+
+    def _latest(self, enterprise_id, team_id, is_enterprise_install,
+                user_id=None, bot=False):
+        """ Return the latest installation row matching the lookup """
+
+        # Org-wide installs are shared by every team in the enterprise
+        if is_enterprise_install:
+            team_id = None
+
+        query = SlackInstallation.query.filter(
+            SlackInstallation.enterprise_id == enterprise_id,
+            SlackInstallation.team_id == team_id)
+        if user_id is not None:
+            query = query.filter(SlackInstallation.user_id == user_id)
+        if bot:
+            query = query.filter(SlackInstallation.bot_token.isnot(None))
+
+        return (query
+                .order_by(SlackInstallation.installed_at.desc(),
+                          SlackInstallation.id.desc())
+                .first())
+
+
+class SQLOAuthStateStore(OAuthStateStore):
+    """ Keep OAuth state values in the slack_oauth_states table
+
+    A state can be consumed once, until it expires. Expired states are swept
+    whenever a new one is issued, so the table stays as small as the number
+    of logins in progress.
+    """
+
+    def __init__(self, *, expiration_seconds,
+                 logger=logging.getLogger(__name__)):
+        self.expiration_seconds = expiration_seconds
+        self._logger = logger
+
+    @property
+    def logger(self) -> Logger:
+        return self._logger
+
+    def issue(self):
+        """ Return a new state value """
+
+        state = str(uuid4())
+        self.sweep()
+        db.session.add(SlackOAuthState(
+            state=state,
+            expire_at=datetime.now()
+            + timedelta(seconds=self.expiration_seconds)))
+        db.session.commit()
+
+        return state
+
+    def consume(self, state):
+        """ Remove a state, returning whether it was issued and not expired """
+
+        if not state:
+            return False
+
+        table = SlackOAuthState.__table__
+        consumed = db.session.execute(
+            table.delete()
+            .where(db.and_(table.c.state == state,
+                           table.c.expire_at >= datetime.now()))
+            .returning(table.c.state)).first()
+        db.session.commit()
+
+        return consumed is not None
+
+    def sweep(self):
+        """ Remove expired states, without committing """
+
+        table = SlackOAuthState.__table__
+        db.session.execute(
+            table.delete().where(table.c.expire_at < datetime.now()))
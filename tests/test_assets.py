@@ -0,0 +1,62 @@
+"""Compression and static file tests."""
+
+# run these tests like:
+#
+#    FLASK_ENV=production python -m unittest tests/test_assets.py
+
+
+from app import create_app
+import gzip
+from unittest import TestCase
+
+from flask import url_for
+
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
+
+
+class AssetsTestCase(TestCase):
+    """Test response compression and fingerprinted static files."""
+
+    def setUp(self):
+        """Create test client."""
+
+        self.client = app.test_client()
+
+    def test_compress_html(self):
+        """Are large HTML pages gzipped for clients that accept it?"""
+
+        resp = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(resp.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', resp.headers['Vary'])
+        self.assertIn(b'Login with Slack', gzip.decompress(resp.data))
+
+        resp = self.client.get('/')
+        self.assertNotIn('Content-Encoding', resp.headers)
+        self.assertIn(b'Login with Slack', resp.data)
+
+    def test_compress_threshold(self):
+        """Are small responses sent as they are?"""
+
+        app.config['COMPRESS_MIN_SIZE'] = 1024 * 1024
+        self.addCleanup(app.config.__setitem__, 'COMPRESS_MIN_SIZE', 500)
+
+        resp = self.client.get('/', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', resp.headers)
+
+    def test_static_version(self):
+        """Are static files fingerprinted and cached for good?"""
+
+        with app.test_request_context():
+            url = url_for('static', filename='app.js')
+        self.assertRegex(url, r'/static/app\.js\?v=[0-9a-f]{12}$')
+
+        resp = self.client.get(url)
+        self.assertIn('immutable', resp.headers['Cache-Control'])
+        resp.close()
+
+        # Outdated versions must still be revalidated
+        resp = self.client.get('/static/app.js?v=outdated')
+        self.assertNotIn('immutable', resp.headers.get('Cache-Control', ''))
+        resp.close()
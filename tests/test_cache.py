@@ -0,0 +1,94 @@
+"""Cache tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_cache.py
+
+
+from unittest import TestCase, mock
+
+from cache import LRUCache
+
+
+class LRUCacheTestCase(TestCase):
+    """Test the process-local LRU cache."""
+
+    def test_get_set(self):
+        """Are cached values returned until they are deleted?"""
+
+        cache = LRUCache(maxsize=2)
+        cache.set(1, 'one')
+
+        self.assertEqual(cache.get(1), 'one')
+        self.assertIsNone(cache.get(2))
+
+        cache.delete(1)
+        self.assertIsNone(cache.get(1))
+
+    def test_evicts_least_recently_used(self):
+        """Is the least recently used entry evicted when full?"""
+
+        cache = LRUCache(maxsize=2)
+        cache.set(1, 'one')
+        cache.set(2, 'two')
+        cache.get(1)
+        cache.set(3, 'three')
+
+        self.assertEqual(cache.get(1), 'one')
+        self.assertIsNone(cache.get(2))
+        self.assertEqual(len(cache), 2)
+
+    def test_ttl(self):
+        """Do entries expire after their time to live?"""
+
+        cache = LRUCache(maxsize=2, ttl=10)
+
+        with mock.patch('cache.time.monotonic', return_value=100):
+            cache.set(1, 'one')
+        with mock.patch('cache.time.monotonic', return_value=105):
+            self.assertEqual(cache.get(1), 'one')
+        with mock.patch('cache.time.monotonic', return_value=111):
+            self.assertIsNone(cache.get(1))
+
+    def test_maxbytes(self):
+        """Are entries evicted to keep the cache under its byte limit?"""
+
+        cache = LRUCache(maxsize=10, maxbytes=10)
+        cache.set(1, 'aaaa')
+        cache.set(2, 'bbbb')
+        cache.set(3, 'cccc')
+
+        self.assertIsNone(cache.get(1))
+        self.assertEqual(cache.get(3), 'cccc')
+        self.assertEqual(cache.stats()['bytes'], 8)
+
+        # Values larger than the whole cache are not stored
+        cache.set(4, 'd' * 11)
+        self.assertIsNone(cache.get(4))
+        self.assertEqual(len(cache), 2)
+
+    def test_delete_where(self):
+        """Are only the matching keys removed?"""
+
+        cache = LRUCache()
+        cache.set((1, 'all'), 'one')
+        cache.set((1, 'important'), 'two')
+        cache.set((2, 'all'), 'three')
+
+        cache.delete_where(lambda key: key[0] == 1)
+
+        self.assertEqual(len(cache), 1)
+        self.assertEqual(cache.get((2, 'all')), 'three')
+
+    def test_stats(self):
+        """Are hits and misses counted?"""
+
+        cache = LRUCache()
+        cache.set(1, 'one')
+        cache.get(1)
+        cache.get(2)
+
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hit_rate'], 0.5)
@@ -0,0 +1,75 @@
+"""Change event tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_events.py
+
+
+from unittest import TestCase
+
+from events import EventBroker, RELOAD
+
+
+class EventBrokerTestCase(TestCase):
+    """Test fanning out change events to the streams of users."""
+
+    def setUp(self):
+        # Nothing connects to this, since the broker isn't started
+        self.broker = EventBroker('postgresql:///unused', queue_size=2)
+
+    def test_publish_to_user(self):
+        """Are events put on every stream of their user only?"""
+
+        first = self.broker.subscribe(1)
+        second = self.broker.subscribe(1)
+        other = self.broker.subscribe(2)
+
+        self.broker.dispatch(
+            '{"user_id": 1, "event": "task.created", "ids": [5]}')
+
+        for queue in (first, second):
+            self.assertEqual(queue.get_nowait(),
+                             {'event': 'task.created', 'ids': [5]})
+        self.assertTrue(other.empty())
+        self.assertEqual(self.broker.stream_count(), 3)
+
+    def test_unsubscribe(self):
+        """Are closed streams left out?"""
+
+        queue = self.broker.subscribe(1)
+        self.broker.unsubscribe(1, queue)
+
+        self.broker.dispatch(
+            '{"user_id": 1, "event": "task.deleted", "ids": [5]}')
+
+        self.assertTrue(queue.empty())
+        self.assertEqual(self.broker.stream_count(), 0)
+
+    def test_full_queue_reloads(self):
+        """Do streams that fall behind get told to reload?"""
+
+        queue = self.broker.subscribe(1)
+        for id in range(3):
+            self.broker.publish(1, {'event': 'task.updated', 'ids': [id]})
+
+        self.assertEqual(queue.get_nowait(), RELOAD)
+        self.assertTrue(queue.empty())
+
+    def test_too_many_ids_reload(self):
+        """Are events without ids sent as reload?"""
+
+        queue = self.broker.subscribe(1)
+        self.broker.dispatch(
+            '{"user_id": 1, "event": "task.updated", "ids": null}')
+
+        self.assertEqual(queue.get_nowait(), RELOAD)
+
+    def test_malformed_payload(self):
+        """Are payloads that are not events ignored?"""
+
+        queue = self.broker.subscribe(1)
+        with self.assertLogs('events', 'WARNING'):
+            self.broker.dispatch('not json')
+            self.broker.dispatch('{"event": "task.updated"}')
+
+        self.assertTrue(queue.empty())
@@ -5,24 +5,15 @@
 #    FLASK_ENV=production python -m unittest tests/test_group_views.py
 
 
-from app import app
+from app import create_app
 import os
 from unittest import TestCase
 
 from models import db, connect_db, Task, Group, User
 
-# Use test database and don't clutter tests with SQL
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///dolt_test'
-app.config['SQLALCHEMY_ECHO'] = False
-
-# Make Flask errors be real errors, rather than HTML pages with error info
-app.config['TESTING'] = True
-
-# This is a bit of hack, but don't use Flask DebugToolbar
-app.config['DEBUG_TB_HOSTS'] = ['dont-show-debug-toolbar']
-
-# Don't req CSRF for testing
-app.config['WTF_CSRF_ENABLED'] = False
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
 
 
 # Create our tables (we do this here, so we only create the tables
@@ -40,6 +31,7 @@ class GroupViewTestCase(TestCase):
 
         db.drop_all()
         db.create_all()
+        app.user_cache.clear()
 
         self.client = app.test_client()
 
@@ -69,11 +61,12 @@ class GroupViewTestCase(TestCase):
 
             resp = c.post("api/groups/new", json={"name": "Shopping list"})
 
-            # Make sure it redirects
-            self.assertEqual(resp.status_code, 302)
+            # Make sure it returns the new group
+            self.assertEqual(resp.status_code, 201)
 
             group = Group.query.one()
             self.assertEqual(group.name, "Shopping list")
+            self.assertEqual(resp.json['id'], group.id)
 
     def test_add_no_session(self):
         """ Do we get redirected if we are not logged in? """
@@ -144,6 +137,39 @@ class GroupViewTestCase(TestCase):
             g = Group.query.get(246)
             self.assertIsNone(g)
 
+    def test_group_delete_keeps_tasks(self):
+        """ Are the tasks of a deleted group kept without a group? """
+        db.session.add(Group(id=246, name="Work", user_id=self.testuser.id))
+        db.session.add(Task(id=12345, title="a test task", group_id=246,
+                            user_id=self.testuser.id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get("/api/groups/246/delete")
+            self.assertEqual(resp.status_code, 302)
+
+            self.assertIsNone(Group.query.get(246))
+            self.assertIsNone(Task.query.get(12345).group_id)
+
+    def test_group_delete_other_user(self):
+        """ Are groups of other users left alone? """
+        db.session.add(User(id=722, name='Bob', email="bob@gmail.com",
+                            slack_user_id="76", slack_team_id='ab43',
+                            slack_img_url='testimg3.com'))
+        db.session.add(Group(id=246, name="Bob's group", user_id=722))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get("/api/groups/246/delete")
+            self.assertEqual(resp.status_code, 404)
+            self.assertIsNotNone(Group.query.get(246))
+
     def test_group_delete_no_authentication(self):
         """ Can any group be deleted without authentication? """
         g = Group(
@@ -0,0 +1,99 @@
+"""Connection pool tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_pool.py
+
+
+from threading import Thread
+from unittest import TestCase, mock
+import os
+import sqlite3
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import NullPool
+
+from app import create_app
+from config import ProductionConfig
+from models import db
+from pool import InstrumentedQueuePool, engine_options
+
+
+class InstrumentedQueuePoolTestCase(TestCase):
+    """Test the checkout stats of the instrumented pool."""
+
+    def setUp(self):
+        self.pool = InstrumentedQueuePool(
+            lambda: sqlite3.connect(':memory:', check_same_thread=False),
+            pool_size=1, max_overflow=0, timeout=0.1)
+
+    def test_saturation(self):
+        """Is the share of the pool in use reported?"""
+
+        conn = self.pool.connect()
+        stats = self.pool.stats()
+        self.assertEqual(stats['checkouts'], 1)
+        self.assertEqual(stats['saturation'], 1)
+
+        conn.close()
+        stats = self.pool.stats()
+        self.assertEqual(stats['saturation'], 0)
+        self.assertEqual(stats['peak_saturation'], 1)
+
+    def test_wait(self):
+        """Are waits for a connection and timeouts recorded?"""
+
+        conn = self.pool.connect()
+        Thread(target=lambda: (time.sleep(0.05), conn.close())).start()
+
+        self.pool.connect().close()
+        self.assertGreaterEqual(self.pool.stats()['max_wait_ms'], 40)
+
+        conn = self.pool.connect()
+        with self.assertRaises(exc.TimeoutError):
+            self.pool.connect()
+        conn.close()
+        self.assertEqual(self.pool.stats()['timeouts'], 1)
+
+
+class EngineOptionsTestCase(TestCase):
+    """Test the engine options built from the DB_* settings."""
+
+    def config(self, **settings):
+        config = vars(ProductionConfig()).copy()
+        config.update(settings)
+        return config
+
+    def test_pooled(self):
+        """Are the pool and statement timeout set from the settings?"""
+
+        options = engine_options(self.config(
+            DB_POOL_SIZE=3, DB_STATEMENT_TIMEOUT=1000))
+
+        self.assertIs(options['poolclass'], InstrumentedQueuePool)
+        self.assertEqual(options['pool_size'], 3)
+        self.assertTrue(options['pool_pre_ping'])
+        self.assertEqual(options['connect_args'],
+                         {'options': '-c statement_timeout=1000'})
+
+    def test_pgbouncer(self):
+        """Are connections left for PgBouncer to pool?"""
+
+        options = engine_options(self.config(DB_PGBOUNCER=True))
+        self.assertEqual(options, {'poolclass': NullPool})
+
+    def test_pgbouncer_replica_timeout(self):
+        """Do replica transactions get the statement timeout too?"""
+
+        # Creating the engines doesn't connect to these databases
+        env = dict(DATABASE_URL='postgresql:///dolt_primary',
+                   REPLICA_DATABASE_URL='postgresql:///dolt_replica',
+                   DB_PGBOUNCER='true')
+        self.addCleanup(setattr, db, 'app', db.app)
+        with mock.patch.dict(os.environ, env):
+            app = create_app('production')
+
+        for bind in (None, 'replica'):
+            engine = db.get_engine(app, bind=bind)
+            self.assertEqual(len(engine.dispatch.begin), 1)
@@ -0,0 +1,158 @@
+"""Query plan tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_query_plans.py
+
+
+from app import create_app
+from unittest import TestCase
+from datetime import date, timedelta
+
+from models import db, Task, Group, User
+
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
+
+
+# Create our tables (we do this here, so we only create the tables
+# once for all tests --- in each test, we'll delete the data
+# and create fresh new clean test data
+
+db.create_all()
+
+# The index expected to serve each quick view, sorted by the default option
+VIEW_INDEXES = {
+    'all': 'ix_tasks_user_completed_created',
+    'important': 'ix_tasks_user_important_open',
+    'completed': 'ix_tasks_user_completed_created',
+}
+DUE_VIEWS = ['today', 'tomorrow', 'later']
+
+
+class QueryPlanTestCase(TestCase):
+    """Test that every task view query is served by an index."""
+
+    def setUp(self):
+        """Seed users, groups and tasks."""
+
+        db.drop_all()
+        db.create_all()
+
+        self.uid = 721
+        self.group_id = 246
+
+        for uid in range(self.uid, self.uid + 5):
+            u = User(
+                name='Janice',
+                email="janice@gmail.com",
+                slack_user_id=f"slack{uid}",
+                slack_team_id='ab43',
+                slack_img_url='testimg2.com')
+            u.id = uid
+            db.session.add(u)
+            db.session.add(
+                Group(id=uid * 10, name="Best group ever", user_id=uid))
+        db.session.add(
+            Group(id=self.group_id, name="Best group ever", user_id=self.uid))
+        db.session.commit()
+
+        today = date.today()
+        tasks = []
+        for i in range(2000):
+            uid = self.uid + i % 5
+            tasks.append(dict(
+                title=f"task {i}",
+                due=today + timedelta(days=i % 7 - 2),
+                important=i % 3 == 0,
+                completed=i % 4 == 0,
+                user_id=uid,
+                group_id=self.group_id if uid == self.uid and i % 2 else None))
+        db.session.bulk_insert_mappings(Task, tasks)
+        db.session.commit()
+
+        db.session.execute('ANALYZE')
+
+    def tearDown(self):
+        res = super().tearDown()
+        db.session.rollback()
+        return res
+
+    def explain(self, query):
+        """Return the plan of a query with sequential scans disabled.
+
+        The planner still falls back to a sequential scan when no index can
+        be used at all, so the plan only shows one if an index is missing.
+        """
+
+        statement = query.statement.compile(dialect=db.engine.dialect)
+        conn = db.session.connection()
+        conn.execute('SET LOCAL enable_seqscan = off')
+        rows = conn.execute('EXPLAIN ' + str(statement), statement.params)
+
+        return '\n'.join(row[0] for row in rows)
+
+    def assertUsesIndex(self, query, index):
+        """Assert that query is served by the named index.
+
+        Any index starting with the user would avoid a sequential scan, so
+        the name tells the intended index from an older, less selective one.
+        """
+
+        plan = self.explain(query)
+        self.assertNotIn('Seq Scan', plan, plan)
+        self.assertIn(index, plan, plan)
+        return plan
+
+    def assertSortedByIndex(self, query):
+        db.session.execute('SET LOCAL enable_sort = off')
+        plan = self.explain(query)
+        self.assertNotIn('Sort', plan, plan)
+
+    def test_task_views(self):
+        """Do all quick views use their index?"""
+
+        for view, index in VIEW_INDEXES.items():
+            with self.subTest(view=view):
+                self.assertUsesIndex(Task.rows_for_view(self.uid, view), index)
+
+    def test_due_views(self):
+        """Do the due views search the due index by their date range?"""
+
+        # Predicates that compute on the column, like due - 1 = today, can
+        # only be filtered after the scan instead of being an index bound
+        for view in DUE_VIEWS:
+            with self.subTest(view=view):
+                plan = self.assertUsesIndex(
+                    Task.rows_for_view(self.uid, view, 'due'),
+                    'ix_tasks_user_completed_due')
+                self.assertRegex(plan, r'Index Cond: .*\bdue\b', plan)
+
+    def test_sorted_lists(self):
+        """Are the open and completed lists returned in index order?"""
+
+        for view in ['all', 'completed']:
+            for sort in Task.SORTS:
+                with self.subTest(view=view, sort=sort):
+                    self.assertSortedByIndex(
+                        Task.rows_for_view(self.uid, view, sort))
+
+    def test_group_view(self):
+        """Does the group view use an index?"""
+
+        self.assertUsesIndex(Task.rows_for_view(self.uid, self.group_id),
+                             'ix_tasks_user_group_open')
+
+    def test_slack_user_lookup(self):
+        """Do the Slack handlers find the user through an index?"""
+
+        self.assertUsesIndex(
+            User.query.filter_by(slack_user_id=f"slack{self.uid}"),
+            'users_slack_user_id_key')
+
+    def test_slack_groups(self):
+        """Does listing the groups of a user use an index?"""
+
+        self.assertUsesIndex(Group.query.filter_by(user_id=self.uid),
+                             'ix_groups_user_id')
@@ -0,0 +1,169 @@
+"""Slack client tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_slack_client.py
+
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Thread
+from unittest import TestCase
+from urllib.parse import parse_qs
+import json
+import time
+
+from slack_client import (
+    SlackClient, SlackClientError, CircuitBreaker, CircuitOpenError)
+
+
+class FakeSlack(BaseHTTPRequestHandler):
+    """Answer with the next queued (status, headers, body, delay)."""
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get('Content-Length', 0))
+        server.requests.append(
+            (self.path, self.headers, self.rfile.read(length)))
+
+        status, headers, body, delay = (server.answers.pop(0)
+                                        if server.answers
+                                        else (200, {}, {'ok': True}, 0))
+        time.sleep(delay)
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class FakeSlackServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients giving up on slow answers close their connection
+        pass
+
+
+class SlackClientTestCase(TestCase):
+    """Test the Slack client against a local fake Slack."""
+
+    def setUp(self):
+        self.server = FakeSlackServer(('127.0.0.1', 0), FakeSlack)
+        self.server.requests = []
+        self.server.answers = []
+        Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.base_url = 'http://127.0.0.1:%d/api/' % self.server.server_port
+        self.slack = SlackClient(
+            base_url=self.base_url, timeout=(1, 0.5), max_retries=2,
+            max_retry_wait=0.2,
+            breaker=CircuitBreaker(failure_threshold=2, reset_timeout=60))
+
+    def tearDown(self):
+        self.slack.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def answer(self, status, body=None, headers=None, delay=0):
+        self.server.answers.append(
+            (status, headers or {}, body or {'ok': status == 200}, delay))
+
+    def test_api_call(self):
+        """Are methods called with the token and form data?"""
+
+        self.answer(200, {'ok': True, 'user': {'id': 'U1'}})
+
+        response = self.slack.users_identity('xoxp-1')
+        self.assertEqual(response['user']['id'], 'U1')
+
+        path, headers, body = self.server.requests[0]
+        self.assertEqual(path, '/api/users.identity')
+        self.assertEqual(headers['Authorization'], 'Bearer xoxp-1')
+
+        self.slack.oauth_v2_access('id', 'secret', 'code', 'https://back')
+        path, headers, body = self.server.requests[1]
+        self.assertEqual(parse_qs(body.decode())['code'], ['code'])
+
+    def test_retry_after(self):
+        """Are rate limited calls retried after Retry-After?"""
+
+        self.answer(429, headers={'Retry-After': '0.1'})
+        self.answer(200, {'ok': True, 'bot_id': 'B1'})
+
+        start = time.monotonic()
+        response = self.slack.auth_test('xoxb-1')
+
+        self.assertEqual(response['bot_id'], 'B1')
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+
+    def test_long_retry_after(self):
+        """Are calls not retried when Slack asks to wait too long?"""
+
+        self.answer(429, headers={'Retry-After': '30'})
+        self.answer(200, {'ok': True, 'bot_id': 'B1'})
+
+        with self.assertRaises(SlackClientError):
+            self.slack.auth_test('xoxb-1')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_retries_bounded(self):
+        """Do calls fail once the retries are used up?"""
+
+        for _ in range(3):
+            self.answer(503)
+
+        with self.assertRaises(SlackClientError):
+            self.slack.auth_test('xoxb-1')
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_read_timeout(self):
+        """Are slow calls given up on without retrying?"""
+
+        self.answer(200, delay=1)
+
+        with self.assertRaises(SlackClientError):
+            self.slack.auth_test('xoxb-1')
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_circuit_breaker(self):
+        """Do calls fail fast after repeated failures?"""
+
+        for _ in range(6):
+            self.answer(500)
+
+        for _ in range(2):
+            with self.assertRaises(SlackClientError):
+                self.slack.auth_test('xoxb-1')
+        self.assertEqual(len(self.server.requests), 6)
+
+        with self.assertRaises(CircuitOpenError):
+            self.slack.auth_test('xoxb-1')
+        self.assertEqual(len(self.server.requests), 6)
+
+    def test_circuit_closes(self):
+        """Does a successful trial call close the circuit?"""
+
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.failed()
+
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+        breaker.succeeded()
+        self.assertTrue(breaker.allow())
+        self.assertTrue(breaker.allow())
+
+    def test_post_response(self):
+        """Are slash command replies posted as JSON?"""
+
+        self.slack.post_response(self.base_url + 'hooks/1', {'text': 'hi'})
+
+        path, headers, body = self.server.requests[0]
+        self.assertEqual(path, '/api/hooks/1')
+        self.assertEqual(json.loads(body), {'text': 'hi'})
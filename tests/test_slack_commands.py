@@ -0,0 +1,61 @@
+"""Slash command runner tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_slack_commands.py
+
+
+from threading import Event
+from unittest import TestCase, mock
+
+from slack_commands import CommandRunner, FAILED_REPLY
+
+
+class CommandRunnerTestCase(TestCase):
+    """Test deferring slash commands to the background runner."""
+
+    def setUp(self):
+        self.slack = mock.MagicMock()
+        self.runner = CommandRunner(mock.MagicMock(), self.slack,
+                                    max_workers=1, max_pending=1)
+        self.form = {'command': '/dolt', 'response_url': 'https://hooks.test'}
+
+    def tearDown(self):
+        self.runner.shutdown()
+
+    def test_posts_reply(self):
+        """Is the reply of a command posted to its response_url?"""
+
+        self.assertTrue(self.runner.submit(lambda form: {'text': 'hi'},
+                                           self.form))
+        self.runner.shutdown()
+
+        self.slack.post_response.assert_called_once_with(
+            'https://hooks.test', {'text': 'hi'})
+
+    def test_posts_failure(self):
+        """Does a failing command still get a reply?"""
+
+        def command(form):
+            raise ValueError(form)
+
+        self.runner.submit(command, self.form)
+        self.runner.shutdown()
+
+        self.slack.post_response.assert_called_once_with(
+            'https://hooks.test', FAILED_REPLY)
+
+    def test_rejects_when_full(self):
+        """Are commands rejected once all workers and slots are taken?"""
+
+        release = Event()
+
+        def command(form):
+            release.wait(5)
+            return {}
+
+        self.assertTrue(self.runner.submit(command, self.form))
+        self.assertTrue(self.runner.submit(command, self.form))
+        self.assertFalse(self.runner.submit(command, self.form))
+
+        release.set()
@@ -0,0 +1,170 @@
+"""Slack store tests."""
+
+# run these tests like:
+#
+#    python -m unittest tests/test_stores.py
+
+
+from app import create_app
+from unittest import TestCase, mock
+from datetime import datetime, timedelta
+
+from slack_sdk.oauth.installation_store import Installation
+
+from models import db, SlackInstallation, SlackOAuthState
+from stores import SQLInstallationStore, SQLOAuthStateStore
+
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
+
+
+# Create our tables (we do this here, so we only create the tables
+# once for all tests --- in each test, we'll delete the data
+# and create fresh new clean test data
+
+db.create_all()
+
+
+class InstallationStoreTestCase(TestCase):
+    """Test the SQL installation store."""
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+
+        self.store = SQLInstallationStore()
+
+    def tearDown(self):
+        res = super().tearDown()
+        db.session.rollback()
+        return res
+
+    def install(self, user_id, bot_token=None):
+        self.store.save(Installation(
+            app_id='A1',
+            team_id='T1',
+            user_id=user_id,
+            user_token=f'xoxp-{user_id}',
+            bot_token=bot_token,
+            bot_id='B1' if bot_token else None,
+            bot_user_id='U0' if bot_token else None,
+            bot_scopes='commands,chat:write'))
+
+    def test_find_installation(self):
+        """Is the latest installation of a team or user found?"""
+
+        self.install('U1', bot_token='xoxb-1')
+        self.install('U2')
+
+        installation = self.store.find_installation(
+            enterprise_id=None, team_id='T1')
+        self.assertEqual(installation.user_id, 'U2')
+
+        installation = self.store.find_installation(
+            enterprise_id=None, team_id='T1', user_id='U1')
+        self.assertEqual(installation.user_token, 'xoxp-U1')
+        self.assertEqual(installation.bot_scopes, ['commands', 'chat:write'])
+
+        self.assertIsNone(self.store.find_installation(
+            enterprise_id=None, team_id='T2'))
+
+    def test_find_bot(self):
+        """Is the bot found even if the latest install was without one?"""
+
+        self.install('U1', bot_token='xoxb-1')
+        self.install('U2')
+
+        bot = self.store.find_bot(enterprise_id=None, team_id='T1')
+        self.assertEqual(bot.bot_token, 'xoxb-1')
+        self.assertEqual(bot.bot_id, 'B1')
+
+        self.assertIsNone(
+            self.store.find_bot(enterprise_id='E1', team_id='T1'))
+
+
+class OAuthStateStoreTestCase(TestCase):
+    """Test the SQL OAuth state store."""
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+
+        self.store = SQLOAuthStateStore(expiration_seconds=300)
+
+    def tearDown(self):
+        res = super().tearDown()
+        db.session.rollback()
+        return res
+
+    def test_consume_once(self):
+        """Can an issued state be consumed exactly once?"""
+
+        state = self.store.issue()
+
+        self.assertTrue(self.store.consume(state))
+        self.assertFalse(self.store.consume(state))
+        self.assertFalse(self.store.consume('never-issued'))
+        self.assertFalse(self.store.consume(None))
+
+    def test_expired_state(self):
+        """Are expired states rejected and swept?"""
+
+        state = self.store.issue()
+        later = datetime.now() + timedelta(seconds=301)
+
+        with mock.patch('stores.datetime') as mock_datetime:
+            mock_datetime.now.return_value = later
+            self.assertFalse(self.store.consume(state))
+
+            self.store.issue()
+
+        self.assertEqual(SlackOAuthState.query.count(), 1)
+        self.assertIsNone(SlackOAuthState.query.get(state))
+
+
+class OAuthCallbackTestCase(TestCase):
+    """Test completing an installation of the Slack app."""
+
+    def setUp(self):
+        db.drop_all()
+        db.create_all()
+
+        self.client = app.test_client()
+
+        with app.app_context():
+            self.state = SQLOAuthStateStore(expiration_seconds=300).issue()
+
+    def tearDown(self):
+        res = super().tearDown()
+        db.session.rollback()
+        return res
+
+    def callback(self):
+        return self.client.get(
+            f'/slack/install/callback?code=c0de&state={self.state}')
+
+    def test_invalid_code(self):
+        """Is an installation Slack refused not saved?"""
+
+        with mock.patch.object(app.slack, 'oauth_v2_access', return_value={
+                'ok': False, 'error': 'invalid_code'}):
+            resp = self.callback()
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('invalid_code', resp.get_data(as_text=True))
+        self.assertEqual(SlackInstallation.query.count(), 0)
+
+    def test_invalid_bot_token(self):
+        """Is an installation whose bot token fails auth.test not saved?"""
+
+        with mock.patch.object(app.slack, 'oauth_v2_access', return_value={
+                'ok': True, 'app_id': 'A1', 'team': {'id': 'T1'},
+                'access_token': 'xoxb-1'}), \
+            mock.patch.object(app.slack, 'auth_test', return_value={
+                'ok': False, 'error': 'invalid_auth'}):
+            resp = self.callback()
+
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('invalid_auth', resp.get_data(as_text=True))
+        self.assertEqual(SlackInstallation.query.count(), 0)
@@ -5,25 +5,18 @@
 #    python -m unittest tests/test_task_model.py
 
 
-from app import app
+from app import create_app
 import os
 from unittest import TestCase
 from sqlalchemy import exc
 
-from models import db, User, Task
+from datetime import date, timedelta
 
-# Use test database and don't clutter tests with SQL
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///dolt_test'
-app.config['SQLALCHEMY_ECHO'] = False
+from models import db, User, Task, Group
 
-# Make Flask errors be real errors, rather than HTML pages with error info
-app.config['TESTING'] = True
-
-# This is a bit of hack, but don't use Flask DebugToolbar
-app.config['DEBUG_TB_HOSTS'] = ['dont-show-debug-toolbar']
-
-# Don't req CSRF for testing
-app.config['WTF_CSRF_ENABLED'] = False
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
 
 
 # Create our tables (we do this here, so we only create the tables
@@ -75,3 +68,54 @@ class TaskModelTestCase(TestCase):
         # User should have 1 task
         self.assertEqual(len(self.u.tasks), 1)
         self.assertEqual(self.u.tasks[0].title, "Get groceries")
+
+    def test_filter_criteria(self):
+        """Do Slack filters match tasks matching any of them?"""
+
+        db.session.add(Group(id=246, name="Work", user_id=self.uid))
+        tomorrow = date.today() + timedelta(days=1)
+        db.session.add_all([
+            Task(id=1, title="starred", important=True, user_id=self.uid),
+            Task(id=2, title="work", group_id=246, user_id=self.uid),
+            Task(id=3, title="tomorrow", due=tomorrow, user_id=self.uid),
+            Task(id=4, title="done", important=True, completed=True,
+                 user_id=self.uid),
+        ])
+        db.session.commit()
+
+        def titles(**filters):
+            rows = (Task
+                    .rows_for_view(self.uid, 'all')
+                    .filter(Task.filter_criteria(**filters)))
+            return {row.title for row in rows}
+
+        self.assertEqual(titles(), {"starred", "work", "tomorrow"})
+        self.assertEqual(titles(important=True), {"starred"})
+        self.assertEqual(titles(due='tomorrow', group_name="Work"),
+                         {"work", "tomorrow"})
+        self.assertEqual(titles(due='tomorrow', group_name="Work",
+                                match_all=True), set())
+        self.assertEqual(titles(group_name="Work", match_all=True), {"work"})
+
+    def test_view_counts(self):
+        """Are tasks counted in every quick view and group?"""
+
+        db.session.add(Group(id=246, name="Work", user_id=self.uid))
+        tomorrow = date.today() + timedelta(days=1)
+        db.session.add_all([
+            Task(title="starred", important=True, user_id=self.uid),
+            Task(title="work", group_id=246, due=tomorrow, user_id=self.uid),
+            Task(title="done", group_id=246, completed=True,
+                 user_id=self.uid),
+        ])
+        db.session.commit()
+
+        self.assertEqual(Task.view_counts(self.uid), {
+            'all': 2,
+            'important': 1,
+            'completed': 1,
+            'today': 1,
+            'tomorrow': 1,
+            'later': 0,
+            'groups': {246: 1},
+        })
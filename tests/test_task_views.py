@@ -5,24 +5,20 @@
 #    FLASK_ENV=production python -m unittest tests/test_task_views.py
 
 
-from app import app
+from app import create_app
 import os
 from unittest import TestCase
+from datetime import date, timedelta
 
-from models import db, connect_db, Task, User
+from flask import g
+from sqlalchemy import event
 
-# Use test database and don't clutter tests with SQL
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///dolt_test'
-app.config['SQLALCHEMY_ECHO'] = False
+from models import db, connect_db, Task, Group, User
+from events import EventBroker
 
-# Make Flask errors be real errors, rather than HTML pages with error info
-app.config['TESTING'] = True
-
-# This is a bit of hack, but don't use Flask DebugToolbar
-app.config['DEBUG_TB_HOSTS'] = ['dont-show-debug-toolbar']
-
-# Don't req CSRF for testing
-app.config['WTF_CSRF_ENABLED'] = False
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
 
 
 # Create our tables (we do this here, so we only create the tables
@@ -40,6 +36,10 @@ class TaskViewTestCase(TestCase):
 
         db.drop_all()
         db.create_all()
+        app.user_cache.clear()
+        app.counts_cache.clear()
+        app.page_cache.clear()
+        app.recent_writers.clear()
 
         self.client = app.test_client()
 
@@ -70,11 +70,45 @@ class TaskViewTestCase(TestCase):
 
             resp = c.post("api/tasks/new", json={"title": "Clean the garage"})
 
-            # Make sure it redirects
-            self.assertEqual(resp.status_code, 302)
+            # Make sure it returns the id of the new task
+            self.assertEqual(resp.status_code, 201)
 
             task = Task.query.one()
             self.assertEqual(task.title, "Clean the garage")
+            self.assertEqual(resp.json['ids'], [task.id])
+
+    def test_add_tasks_bulk(self):
+        """ Can several tasks be added with one request? """
+        db.session.add(Group(id=246, name="Work", user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.post("api/tasks/bulk", json=[
+                {"title": "Clean the garage"},
+                {"title": "Write the report", "group": "Work",
+                 "date": "2030-01-31", "important": True},
+            ])
+            self.assertEqual(resp.status_code, 201)
+            self.assertEqual(len(resp.json['ids']), 2)
+
+            task = Task.query.get(resp.json['ids'][1])
+            self.assertEqual(task.title, "Write the report")
+            self.assertEqual(task.group_id, 246)
+            self.assertTrue(task.important)
+
+            resp = c.post("api/tasks/bulk", json=[{"description": "no title"}])
+            self.assertEqual(resp.status_code, 400)
+
+            # One bad task fails the request before anything is added
+            for task in ({"title": "Pay rent", "date": "2030-13-01"},
+                         {"title": "Pay rent", "important": "false"}):
+                resp = c.post("api/tasks/bulk",
+                              json=[{"title": "Clean the attic"}, task])
+                self.assertEqual(resp.status_code, 400)
+            self.assertEqual(Task.query.count(), 2)
 
     def test_add_no_session(self):
         """ Do we get redirected if we are not logged in? """
@@ -125,6 +159,510 @@ class TaskViewTestCase(TestCase):
             self.assertEqual(resp.status_code, 200)
             self.assertIn(t.title, str(resp.data))
 
+    def test_tasks_sorted(self):
+        """ Are tasks listed in the sorting order of the session? """
+        for i, title in enumerate(["Bake bread", "Clean", "Answer emails"]):
+            db.session.add(
+                Task(id=12345 + i, title=title, user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+                sess['sort'] = 'alphabetical'
+
+            resp = c.get('/tasks')
+            html = resp.get_data(as_text=True)
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertLess(html.index("Answer emails"),
+                            html.index("Bake bread"))
+            self.assertLess(html.index("Bake bread"), html.index("Clean"))
+
+    def test_tasks_paginated(self):
+        """ Are long task lists split into pages by a cursor? """
+        for i in range(5):
+            db.session.add(
+                Task(id=12345 + i, title=f"task {i}", user_id=self.testuser_id))
+        db.session.commit()
+
+        app.config['TASKS_PAGE_SIZE'] = 3
+        self.addCleanup(app.config.__setitem__, 'TASKS_PAGE_SIZE', 50)
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+                sess['sort'] = 'alphabetical'
+
+            resp = c.get('/tasks')
+            html = resp.get_data(as_text=True)
+
+            self.assertIn("task 2", html)
+            self.assertNotIn("task 3", html)
+            cursor = html.partition('data-cursor="')[2].partition('"')[0]
+
+            resp = c.get('/tasks', query_string={'cursor': cursor})
+            html = resp.get_data(as_text=True)
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotIn("task 2", html)
+            self.assertIn("task 3", html)
+            self.assertIn("task 4", html)
+            self.assertNotIn("data-cursor", html)
+
+            resp = c.get('/tasks', query_string={'cursor': 'not-a-cursor'})
+            self.assertEqual(resp.status_code, 400)
+
+    def test_task_list_queries(self):
+        """ Is the number of queries independent of the number of tasks? """
+        for i in range(3):
+            db.session.add(
+                Group(id=246 + i, name=f"group {i}", user_id=self.testuser_id))
+        db.session.commit()
+
+        def add_tasks(start, count):
+            for i in range(start, start + count):
+                db.session.add(Task(id=12345 + i, title=f"task {i}",
+                                    group_id=246 + i % 3,
+                                    user_id=self.testuser_id))
+            db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            # Cache the user, so that both requests run the same queries
+            c.get('/tasks')
+
+            add_tasks(0, 2)
+            app.counts_cache.clear()
+            app.page_cache.clear()
+            c.get('/tasks')
+            few_tasks = g.query_count
+
+            add_tasks(2, 20)
+            app.counts_cache.clear()
+            app.page_cache.clear()
+            resp = c.get('/tasks')
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn("group 2", str(resp.data))
+            self.assertEqual(g.query_count, few_tasks)
+
+    def test_user_cached(self):
+        """ Is the logged in user only loaded from the db once? """
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            c.get('/tasks')
+            first_request = g.query_count
+
+            app.counts_cache.clear()
+            app.page_cache.clear()
+            c.get('/tasks')
+            self.assertEqual(g.query_count, first_request - 1)
+            self.assertEqual(g.user.name, 'Janice')
+
+    def test_due_buckets(self):
+        """ Are open tasks counted by when they are due? """
+        today = date.today()
+        for i, days in enumerate([-3, 0, 0, 1, 2, 30]):
+            db.session.add(Task(id=12345 + i, title=f"task {i}",
+                                due=today + timedelta(days=days),
+                                user_id=self.testuser_id))
+        db.session.add(Task(id=12399, title="done", due=today, completed=True,
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get('/api/tasks/due')
+
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json, {
+                'overdue': {'count': 1, 'ids': [12345]},
+                'today': {'count': 2, 'ids': [12346, 12347]},
+                'tomorrow': {'count': 1, 'ids': [12348]},
+                'later': {'count': 2, 'ids': [12349, 12350]},
+            })
+
+    def test_sidebar_counts(self):
+        """ Are sidebar counts cached until the tasks change? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            # The user is cached by the first request
+            c.get('/tasks/important')
+            app.counts_cache.clear()
+
+            c.get('/tasks/important')
+            counted = g.query_count
+
+            app.page_cache.clear()
+            resp = c.get('/tasks/important')
+            self.assertEqual(g.query_count, counted - 1)
+            self.assertIn('>1</span', resp.get_data(as_text=True))
+
+            c.post('/api/tasks/important', json={'id': 12345})
+            self.assertIsNone(app.counts_cache.get(self.testuser_id))
+
+    def test_task_list_etag(self):
+        """ Is an unchanged task list answered with 304 Not Modified? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get('/tasks')
+            self.assertEqual(resp.status_code, 200)
+            etag = resp.headers['ETag']
+
+            resp = c.get('/tasks', headers={'If-None-Match': etag})
+            self.assertEqual(resp.status_code, 304)
+            self.assertEqual(resp.data, b'')
+
+            # Another view of the same data has its own ETag
+            resp = c.get('/tasks/important', headers={'If-None-Match': etag})
+            self.assertEqual(resp.status_code, 200)
+
+            c.post('/api/tasks/important', json={'id': 12345})
+
+            resp = c.get('/tasks', headers={'If-None-Match': etag})
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotEqual(resp.headers['ETag'], etag)
+
+    def test_task_list_etag_other_user(self):
+        """ Is the ETag of a user's task list no good to another user? """
+        db.session.add(User(id=722, name='Bob', email="bob@gmail.com",
+                            slack_user_id="76", slack_team_id='ab43',
+                            slack_img_url='testimg3.com'))
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get('/tasks')
+            etag = resp.headers['ETag']
+
+            # Both users are at the same data version
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = 722
+
+            resp = c.get('/tasks', headers={'If-None-Match': etag})
+            self.assertEqual(resp.status_code, 200)
+            self.assertNotEqual(resp.headers['ETag'], etag)
+            self.assertNotIn("a test task", resp.get_data(as_text=True))
+
+    def test_task_page_cache(self):
+        """ Are rendered pages reused until the tasks change? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            first = c.get('/tasks')
+            hits = app.page_cache.stats()['hits']
+
+            # Only the data version of the user is read
+            second = c.get('/tasks')
+            self.assertEqual(g.query_count, 1)
+            self.assertEqual(second.data, first.data)
+            self.assertEqual(app.page_cache.stats()['hits'], hits + 1)
+
+            c.post('/api/tasks/important', json={'id': 12345})
+            self.assertEqual(len(app.page_cache), 0)
+
+            resp = c.get('/tasks')
+            self.assertGreater(g.query_count, 1)
+            self.assertIn('task important', resp.get_data(as_text=True))
+
+    def test_replica_reads(self):
+        """ Are task views read from the replica until the user writes? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        # Use the test database as its own replica
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        app.config['SQLALCHEMY_BINDS'] = {'replica': uri}
+        app.config['REPLICA_DATABASE_URL'] = uri
+        self.addCleanup(app.config.update,
+                        SQLALCHEMY_BINDS=None, REPLICA_DATABASE_URL=None)
+
+        replica_queries = []
+        replica = db.get_engine(app, bind='replica')
+
+        def count(*args):
+            replica_queries.append(args[2])
+
+        event.listen(replica, 'before_cursor_execute', count)
+        self.addCleanup(replica.dispose)
+        self.addCleanup(event.remove, replica, 'before_cursor_execute', count)
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get('/tasks')
+            self.assertEqual(resp.status_code, 200)
+            self.assertTrue(replica_queries)
+
+            # Writes go to the primary and pin the reads of the user to it
+            del replica_queries[:]
+            c.post('/api/tasks/important', json={'id': 12345})
+
+            # Another worker only has the session to go by
+            app.recent_writers.clear()
+
+            resp = c.get('/tasks/important')
+            self.assertIn("a test task", resp.get_data(as_text=True))
+            self.assertEqual(replica_queries, [])
+
+    def test_task_cards(self):
+        """ Are only the cards of tasks listed in the view rendered? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.add(Task(id=23456, title="an important task",
+                            important=True, user_id=self.testuser_id))
+        db.session.add(User(id=722, name='Bob', email="bob@gmail.com",
+                            slack_user_id="76", slack_team_id='ab43',
+                            slack_img_url='testimg3.com'))
+        db.session.add(Task(id=34567, title="someone else's task",
+                            important=True, user_id=722))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get(
+                '/api/tasks/cards?view=important&ids=12345,23456,34567')
+            html = resp.get_data(as_text=True)
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn('data-task="23456"', html)
+            self.assertNotIn('data-task="12345"', html)
+            self.assertNotIn('data-task="34567"', html)
+
+            resp = c.get('/api/tasks/cards?view=nope&ids=12345')
+            self.assertEqual(resp.status_code, 400)
+
+            resp = c.get('/api/tasks/cards?view=all&ids=x')
+            self.assertEqual(resp.status_code, 400)
+
+    def test_change_events(self):
+        """ Are committed changes sent to the streams of their user? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        broker = EventBroker(app.config['SQLALCHEMY_DATABASE_URI'])
+        broker.start()
+        self.addCleanup(broker.stop)
+        self.assertTrue(broker.listening.wait(5))
+
+        queue = broker.subscribe(self.testuser_id)
+        other = broker.subscribe(722)
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            c.post('/api/tasks/important', json={'id': 12345})
+
+        self.assertEqual(queue.get(timeout=5),
+                         {'event': 'task.updated', 'ids': [12345]})
+        self.assertTrue(other.empty())
+
+    def test_metrics(self):
+        """ Are the stats of the process only shown with the token? """
+        self.addCleanup(app.config.update, METRICS_TOKEN=None)
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get('/api/metrics')
+            self.assertEqual(resp.status_code, 404)
+
+            app.config['METRICS_TOKEN'] = 's3cret'
+            resp = c.get('/api/metrics')
+            self.assertEqual(resp.status_code, 404)
+
+            resp = c.get('/api/metrics',
+                         headers={'Authorization': 'Bearer s3cret'})
+            self.assertEqual(resp.status_code, 200)
+            self.assertIn('pages', resp.json)
+
+    def test_task_star(self):
+        """ Does starring a task return its new state? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.post('/api/tasks/important', json={'id': 12345})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json, {'id': 12345, 'important': True})
+
+            resp = c.post('/api/tasks/important', json={'id': 12345})
+            self.assertEqual(resp.json, {'id': 12345, 'important': False})
+
+    def test_task_complete(self):
+        """ Does completing a task return its new state? """
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.post('/api/tasks/completed', json={'id': 12345})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(resp.json, {'id': 12345, 'completed': True})
+            self.assertTrue(Task.query.get(12345).completed)
+
+    def test_task_star_other_user(self):
+        """ Are tasks of other users left alone? """
+        other = User(id=722, name='Bob', email="bob@gmail.com",
+                     slack_user_id="76", slack_team_id='ab43',
+                     slack_img_url='testimg3.com')
+        db.session.add(other)
+        db.session.add(Task(id=12345, title="a test task", user_id=722))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.post('/api/tasks/important', json={'id': 12345})
+            self.assertEqual(resp.status_code, 404)
+            self.assertFalse(Task.query.get(12345).important)
+
+    def test_task_edit(self):
+        """ Can a task be edited? """
+        db.session.add(Group(id=246, name="Work", user_id=self.testuser_id))
+        db.session.add(Task(id=12345, title="a test task",
+                            user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.post('/api/tasks/12345/edit', data={
+                'title': "an edited task",
+                'description': "with a description",
+                'date': "2030-01-31",
+                'group': "Work"})
+            self.assertEqual(resp.status_code, 302)
+
+            task = Task.query.get(12345)
+            self.assertEqual(task.title, "an edited task")
+            self.assertEqual(task.due, date(2030, 1, 31))
+            self.assertEqual(task.group_id, 246)
+
+    def test_task_batch(self):
+        """ Can many tasks be changed with one request? """
+        for i in range(3):
+            db.session.add(Task(id=12345 + i, title=f"task {i}",
+                                user_id=self.testuser_id))
+        db.session.commit()
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.post('/api/tasks/batch',
+                          json={'op': 'complete', 'ids': [12345, 12346, 99]})
+            self.assertEqual(resp.status_code, 200)
+            self.assertEqual(sorted(resp.json['ids']), [12345, 12346])
+
+            completed = Task.query.filter_by(completed=True).count()
+            self.assertEqual(completed, 2)
+
+            resp = c.post('/api/tasks/batch',
+                          json={'op': 'delete', 'ids': [12345, 12347]})
+            self.assertEqual(Task.query.count(), 1)
+
+            resp = c.post('/api/tasks/batch',
+                          json={'op': 'explode', 'ids': [12346]})
+            self.assertEqual(resp.status_code, 400)
+
+            resp = c.post('/api/tasks/batch', json=[12346])
+            self.assertEqual(resp.status_code, 400)
+
+    def test_slack_add_tasks(self):
+        """ Are tasks added from quoted titles, across lines too? """
+
+        # Build the replies directly, without signing requests
+        add = app.view_functions['dolt.slack_add_task'].__wrapped__
+
+        with app.test_request_context():
+            reply = add({'user_id': "75", 'text':
+                         '"Pack" "Boots\nand socks"; "Book a table"\n"Call"'})
+            self.assertEqual(reply['response_type'], 'in_channel')
+            self.assertEqual(
+                sorted((task.title, task.description) for task in Task.query),
+                [("Book a table", None), ("Call", None),
+                 ("Pack", "Boots\nand socks")])
+
+            for text in ('no quotes', None):
+                reply = add({'user_id': "75", 'text': text})
+                self.assertEqual(reply['response_type'], 'ephemeral')
+            self.assertEqual(Task.query.count(), 3)
+
+    def test_slack_batch_filters(self):
+        """ Are batch commands limited to tasks matching every filter? """
+        db.session.add(Group(id=246, name="Work", user_id=self.testuser_id))
+        today = date.today()
+        db.session.add_all([
+            Task(id=1, title="work today", due=today, group_id=246,
+                 user_id=self.testuser_id),
+            Task(id=2, title="work", group_id=246, user_id=self.testuser_id),
+            Task(id=3, title="today", due=today, user_id=self.testuser_id),
+        ])
+        db.session.commit()
+
+        # Build the replies directly, without signing requests
+        batch = app.view_functions['dolt.slack_batch_tasks'].__wrapped__
+
+        with app.test_request_context():
+            reply = batch({'user_id': "75", 'text': "complete $today (Work)"})
+            self.assertEqual(reply['response_type'], 'in_channel')
+            self.assertEqual(
+                [task.id for task in Task.query.filter_by(completed=True)],
+                [1])
+
+            # A misspelled filter must not match every open task
+            reply = batch({'user_id': "75", 'text': "delete $tomorow"})
+            self.assertEqual(reply['response_type'], 'ephemeral')
+            self.assertIn("$tomorow", reply['text'])
+            self.assertEqual(Task.query.count(), 3)
+
+            # Slack users who never signed in have no tasks to change
+            reply = batch({'user_id': "99", 'text': "complete $today"})
+            self.assertEqual(reply['response_type'], 'ephemeral')
+
     def test_invalid_task_show(self):
         """ Do invalid tasks return errors? """
         with self.client as c:
@@ -155,6 +693,25 @@ class TaskViewTestCase(TestCase):
             t = Task.query.get(12345)
             self.assertIsNone(t)
 
+    def test_task_delete_other_user(self):
+        """ Are tasks of other users left alone? """
+        db.session.add(User(id=722, name='Bob', email="bob@gmail.com",
+                            slack_user_id="76", slack_team_id='ab43',
+                            slack_img_url='testimg3.com'))
+        db.session.add(Task(id=12345, title="a test task", user_id=722))
+        db.session.commit()
+        version = User.get_data_version(722)
+
+        with self.client as c:
+            with c.session_transaction() as sess:
+                sess['CURR_USER_KEY'] = self.testuser.id
+
+            resp = c.get("api/tasks/12345/delete")
+            self.assertEqual(resp.status_code, 404)
+
+            self.assertIsNotNone(Task.query.get(12345))
+            self.assertEqual(User.get_data_version(722), version)
+
     def test_message_delete_no_authentication(self):
         """ Can any task be deleted without authentication? """
         t = Task(
@@ -5,25 +5,16 @@
 #    python -m unittest tests/test_user_model.py
 
 
-from app import app
+from app import create_app
 import os
 from unittest import TestCase
 from sqlalchemy import exc
 
 from models import db, User
 
-# Use test database and don't clutter tests with SQL
-app.config['SQLALCHEMY_DATABASE_URI'] = 'postgresql:///dolt_test'
-app.config['SQLALCHEMY_ECHO'] = False
-
-# Make Flask errors be real errors, rather than HTML pages with error info
-app.config['TESTING'] = True
-
-# This is a bit of hack, but don't use Flask DebugToolbar
-app.config['DEBUG_TB_HOSTS'] = ['dont-show-debug-toolbar']
-
-# Don't req CSRF for testing
-app.config['WTF_CSRF_ENABLED'] = False
+# Use the testing profile: test database, Flask errors as real errors,
+# no debug toolbar and no CSRF
+app = create_app('testing')
 
 
 # Create our tables (we do this here, so we only create the tables